@@ -0,0 +1,334 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core_social import changelog, follow_graph, outbox, tags, versioning
+from core_social.models import (
+    AccountDeletion,
+    ChangeLogEntry,
+    Comment,
+    FollowingRelationships,
+    Like,
+    Notification,
+    OutboxMessage,
+    Post,
+    PostHashtag,
+    PostMention,
+    PostTrendingScore,
+    Profile,
+    ProfileSuggestion,
+)
+
+# Rows are deleted a batch at a time with raw deletes, which skip the
+# collector loading every related row. Each step empties the rows pointing
+# at the ones of later steps, so no batch leaves a dangling foreign key.
+# Steps listing fields to clear null them instead of deleting the rows.
+
+
+def _engagement_removed(profile_id, rows):
+    """Likes or comments of the profile on the posts in rows are gone"""
+    posts = {post_id: author_id for _, post_id, author_id in rows}
+    for post_id, author_id in posts.items():
+        versioning.post_changed(post_id, author_id)
+    changelog.record_many(
+        ChangeLogEntry.ENGAGEMENT,
+        ((author_id, post_id) for post_id, author_id in posts.items()),
+    )
+    return []
+
+
+def _post_likes_removed(profile_id, rows):
+    for liker_id in {liker_id for _, liker_id in rows}:
+        versioning.bump(versioning.liked_by_key(liker_id))
+    return []
+
+
+def _posts_removed(profile_id, rows):
+    for post_id, _ in rows:
+        versioning.bump(versioning.post_key(post_id))
+    changelog.record_many(
+        ChangeLogEntry.POST_DELETED, ((profile_id, post_id) for post_id, _ in rows)
+    )
+    return [image for _, image in rows if image]
+
+
+def _post_hashtags_removed(profile_id, rows):
+    tags.hashtags_removed(hashtag_id for _, hashtag_id in rows)
+    return []
+
+
+def _following_removed(profile_id, rows):
+    for _, following_id in rows:
+        follow_graph.remove_follow(profile_id, following_id)
+        versioning.bump(versioning.profile_key(following_id))
+    return []
+
+
+def _followers_removed(profile_id, rows):
+    for _, follower_id in rows:
+        follow_graph.remove_follow(follower_id, profile_id)
+        versioning.bump(versioning.profile_key(follower_id))
+    changelog.record_many(
+        ChangeLogEntry.FOLLOWING_CHANGED,
+        ((follower_id, None) for _, follower_id in rows),
+    )
+    return []
+
+
+def _nothing_removed(profile_id, rows):
+    return []
+
+
+def _scheduled_posts(profile_id):
+    return OutboxMessage.objects.filter(
+        topic=OutboxMessage.SCHEDULED_POST, payload__author_id=profile_id
+    )
+
+
+# (name, rows of the profile, columns read besides the pk, after each batch,
+# fields cleared instead of deleting)
+STEPS = (
+    (
+        "scheduled_posts",
+        _scheduled_posts,
+        (),
+        _nothing_removed,
+        None,
+    ),
+    (
+        "likes",
+        lambda profile_id: Like.objects.filter(profile_id=profile_id),
+        ("post_id", "post__author_id"),
+        _engagement_removed,
+        None,
+    ),
+    (
+        "comments",
+        lambda profile_id: Comment.objects.filter(author_id=profile_id),
+        ("post_id", "post__author_id"),
+        _engagement_removed,
+        None,
+    ),
+    (
+        "post_likes",
+        lambda profile_id: Like.objects.filter(post__author_id=profile_id),
+        ("profile_id",),
+        _post_likes_removed,
+        None,
+    ),
+    (
+        "post_comments",
+        lambda profile_id: Comment.objects.filter(post__author_id=profile_id),
+        (),
+        _nothing_removed,
+        None,
+    ),
+    (
+        "trending_scores",
+        lambda profile_id: PostTrendingScore.objects.filter(post__author_id=profile_id),
+        (),
+        _nothing_removed,
+        None,
+    ),
+    (
+        "notifications",
+        lambda profile_id: Notification.objects.filter(recipient_id=profile_id),
+        (),
+        _nothing_removed,
+        None,
+    ),
+    (
+        "post_hashtags",
+        lambda profile_id: PostHashtag.objects.filter(post__author_id=profile_id),
+        ("hashtag_id",),
+        _post_hashtags_removed,
+        None,
+    ),
+    (
+        "post_mentions",
+        lambda profile_id: PostMention.objects.filter(post__author_id=profile_id),
+        (),
+        _nothing_removed,
+        None,
+    ),
+    (
+        "mentions",
+        lambda profile_id: PostMention.objects.filter(profile_id=profile_id),
+        (),
+        _nothing_removed,
+        None,
+    ),
+    (
+        "posts",
+        lambda profile_id: Post.objects.filter(author_id=profile_id),
+        ("image",),
+        _posts_removed,
+        None,
+    ),
+    (
+        "following",
+        lambda profile_id: FollowingRelationships.objects.filter(
+            follower_id=profile_id
+        ),
+        ("following_id",),
+        _following_removed,
+        None,
+    ),
+    (
+        "followers",
+        lambda profile_id: FollowingRelationships.objects.filter(
+            following_id=profile_id
+        ),
+        ("follower_id",),
+        _followers_removed,
+        None,
+    ),
+    (
+        "suggestions",
+        lambda profile_id: ProfileSuggestion.objects.filter(
+            Q(profile_id=profile_id) | Q(suggested_id=profile_id)
+        ),
+        (),
+        _nothing_removed,
+        None,
+    ),
+    (
+        "notification_actors",
+        lambda profile_id: Notification.objects.filter(latest_actor_id=profile_id),
+        (),
+        _nothing_removed,
+        ("latest_actor",),
+    ),
+)
+
+
+def request_deletion(profile):
+    """
+    Deactivate the profile's user, which stops its tokens from
+    authenticating and hides the profile and its posts, and queue the
+    deletion for purge to carry out. Followers' feed changes are reset and
+    the posts the profile scheduled are cancelled.
+    """
+    user = profile.user
+    user.is_active = False
+    user.save(update_fields=["is_active"])
+    versioning.profile_changed(profile.id)
+    changelog.record(ChangeLogEntry.FOLLOWING_CHANGED, profile.id)
+    _scheduled_posts(profile.id).delete()
+    deletion = AccountDeletion.objects.create(user=user, profile_id=profile.id)
+    continue_deletion(deletion)
+    return deletion
+
+
+def continue_deletion(deletion):
+    """Queue the next purge of the deletion"""
+    outbox.enqueue(
+        OutboxMessage.ACCOUNT_DELETION,
+        {"deletion_id": deletion.id},
+        dedup_key=f"account-deletion:{deletion.id}",
+    )
+
+
+def _lease_expiry():
+    return timezone.now() + timedelta(
+        seconds=settings.ACCOUNT_DELETION["LEASE_SECONDS"]
+    )
+
+
+def acquire(deletion):
+    """
+    Hold the deletion until purged, False while another purge holds it.
+    The lease expires, so a purge whose worker died is taken over.
+    """
+    return (
+        AccountDeletion.objects.filter(
+            Q(leased_until__isnull=True) | Q(leased_until__lt=timezone.now()),
+            pk=deletion.pk,
+        ).update(leased_until=_lease_expiry())
+        == 1
+    )
+
+
+def release(deletion):
+    AccountDeletion.objects.filter(pk=deletion.pk).update(leased_until=None)
+
+
+def _purge_batch(queryset, columns, batch_size, cleared):
+    rows = list(queryset.order_by().values_list("pk", *columns)[:batch_size])
+    if rows:
+        batch = queryset.model.objects.filter(pk__in=[row[0] for row in rows])
+        if cleared:
+            batch.update(**{field: None for field in cleared})
+        else:
+            batch._raw_delete(queryset.db)
+    return rows
+
+
+def _finish(deletion):
+    """Delete the emptied profile and its user"""
+    profile = Profile.objects.filter(pk=deletion.profile_id).first()
+    files = [profile.profile_image.name] if profile and profile.profile_image else []
+    with transaction.atomic():
+        if profile is not None:
+            profile.delete()
+        if deletion.user_id is not None:
+            get_user_model().objects.filter(pk=deletion.user_id).delete()
+            deletion.user = None
+        deletion.status = AccountDeletion.DONE
+        deletion.finished_at = timezone.now()
+        deletion.save(update_fields=["status", "finished_at", "user"])
+    return files
+
+
+def purge(deletion, max_batches=None):
+    """
+    Delete up to max_batches batches of the account's rows. Returns whether
+    the account is fully deleted and the names of the media files whose
+    rows are gone. Each batch commits on its own, so a purge interrupted
+    at any point continues where it stopped. The caller holds the deletion,
+    see acquire.
+    """
+    config = settings.ACCOUNT_DELETION
+    if max_batches is None:
+        max_batches = config["BATCHES_PER_TASK"]
+    if deletion.status == AccountDeletion.DONE:
+        return True, []
+    if deletion.status == AccountDeletion.PENDING:
+        deletion.status = AccountDeletion.RUNNING
+        deletion.save(update_fields=["status"])
+
+    files = []
+    step = 0
+    while step < len(STEPS):
+        name, rows_of, columns, removed, cleared = STEPS[step]
+        try:
+            with transaction.atomic():
+                rows = _purge_batch(
+                    rows_of(deletion.profile_id),
+                    columns,
+                    config["BATCH_SIZE"],
+                    cleared,
+                )
+                if not rows:
+                    step += 1
+                    continue
+                removed_files = removed(deletion.profile_id, rows)
+                deletion.progress[name] = deletion.progress.get(name, 0) + len(rows)
+                deletion.leased_until = _lease_expiry()
+                deletion.save(update_fields=["progress", "leased_until"])
+        except IntegrityError:
+            # A row was added to an emptied step meanwhile, start over
+            deletion.refresh_from_db(fields=["progress"])
+            step = 0
+        else:
+            files.extend(removed_files)
+        max_batches -= 1
+        if max_batches <= 0:
+            return False, files
+
+    files.extend(_finish(deletion))
+    return True, files
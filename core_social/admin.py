@@ -1,8 +1,30 @@
 from django.contrib import admin
-from core_social.models import Post, Profile, Comment, Like, FollowingRelationships
+from core_social.models import (
+    Post,
+    Profile,
+    Comment,
+    Like,
+    FollowingRelationships,
+    ProfileSuggestion,
+    PostTrendingScore,
+    AccountDeletion,
+    Notification,
+    OutboxMessage,
+    Hashtag,
+    PostHashtag,
+    PostMention,
+)
 
 admin.site.register(Profile)
 admin.site.register(Post)
 admin.site.register(Comment)
 admin.site.register(Like)
 admin.site.register(FollowingRelationships)
+admin.site.register(ProfileSuggestion)
+admin.site.register(PostTrendingScore)
+admin.site.register(AccountDeletion)
+admin.site.register(Notification)
+admin.site.register(OutboxMessage)
+admin.site.register(Hashtag)
+admin.site.register(PostHashtag)
+admin.site.register(PostMention)
@@ -0,0 +1,279 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.exceptions import APIException, AuthenticationFailed, Throttled
+from rest_framework.settings import api_settings as drf_settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+from core_social import follow_graph, versioning
+from core_social.filters import filter_posts, filter_profiles
+from core_social.models import Profile, FollowingRelationships, Post, Like
+from core_social.pagination import ProfileCursorPagination, profile_ordering
+from core_social.serializers import (
+    ProfileListSerializer,
+    ProfileDetailSerializer,
+    PostListSerializer,
+    PostDetailSerializer,
+)
+from core_social.versioning import async_conditional_get
+from core_social.views import (
+    PostViewSet,
+    ProfileViewSet,
+    post_queryset,
+    profile_queryset,
+)
+from social_media_api.renderers import dumps
+
+
+def json_response(data, status_code=status.HTTP_200_OK):
+    return HttpResponse(
+        dumps(data), status=status_code, content_type="application/json"
+    )
+
+
+def jwt_profile_required(view):
+    """
+    Allow only safe methods, authenticate an async view by JWT
+    and pass the viewer's profile to it. API exceptions raised by the
+    view are answered like DRF answers them.
+    """
+    authentication = JWTAuthentication()
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            response = json_response(
+                {"detail": f'Method "{request.method}" not allowed.'},
+                status.HTTP_405_METHOD_NOT_ALLOWED,
+            )
+            response["Allow"] = "GET, HEAD"
+            return response
+
+        try:
+            header = authentication.get_header(request)
+            raw_token = header and authentication.get_raw_token(header)
+            if raw_token is None:
+                raise AuthenticationFailed(
+                    "Authentication credentials were not provided."
+                )
+            token = authentication.get_validated_token(raw_token)
+            profile = (
+                await Profile.objects.select_related("user")
+                .filter(
+                    user_id=token.get(api_settings.USER_ID_CLAIM), user__is_active=True
+                )
+                .afirst()
+            )
+            if profile is None:
+                raise AuthenticationFailed("User not found")
+        except AuthenticationFailed as exc:
+            response = json_response(exc.detail, status.HTTP_401_UNAUTHORIZED)
+            response["WWW-Authenticate"] = authentication.authenticate_header(request)
+            return response
+
+        request.user = profile.user
+        try:
+            return await view(request, profile, *args, **kwargs)
+        except APIException as exc:
+            detail = exc.detail
+            if not isinstance(detail, (dict, list)):
+                detail = {"detail": detail}
+            return json_response(detail, exc.status_code)
+
+    return wrapper
+
+
+def throttled(view_class):
+    """
+    Throttle an async view like its sync view_class, whose throttle scope
+    and search parameters it shares
+    """
+
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            for throttle_class in drf_settings.DEFAULT_THROTTLE_CLASSES:
+                throttle = throttle_class()
+                allowed = await sync_to_async(throttle.allow_request)(
+                    request, view_class()
+                )
+                if not allowed:
+                    exc = Throttled(throttle.wait())
+                    response = json_response(
+                        {"detail": exc.detail}, status.HTTP_429_TOO_MANY_REQUESTS
+                    )
+                    if exc.wait is not None:
+                        response["Retry-After"] = "%d" % exc.wait
+                    return response
+            return await view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+_query_executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_QUERY_WORKERS, thread_name_prefix="async-query"
+)
+
+
+def _evaluate(queryset):
+    try:
+        return list(queryset)
+    finally:
+        connections[queryset.db].close()
+
+
+def start_on_own_connection(queryset):
+    """
+    Start evaluating a queryset in a worker thread with its own database
+    connection, so it runs concurrently with the queries on the request's
+    connection. The connection is closed, or returned to the pool, once the
+    queryset is read, so idle workers hold none. Thread-sensitive ORM calls
+    are awaited directly by the view, running them in separate tasks
+    deadlocks behind sync-only middleware.
+    """
+    return asyncio.ensure_future(
+        sync_to_async(_evaluate, thread_sensitive=False, executor=_query_executor)(
+            queryset
+        )
+    )
+
+
+async def fetch_rows(queryset):
+    return [row async for row in queryset.aiterator()]
+
+
+async def _post_list_response(request, profile, queryset):
+    """
+    Fetch the posts on the request's connection and, when selected, the
+    viewer's likes on a separate one concurrently
+    """
+    viewer_likes = None
+    if "liked_by_user" in PostListSerializer.selected_fields(request):
+        viewer_likes = start_on_own_connection(
+            Like.objects.filter(
+                profile=profile, post__in=queryset.values("pk")
+            ).values_list("post_id", flat=True)
+        )
+    posts = await fetch_rows(queryset)
+    if viewer_likes is not None:
+        liked_post_ids = set(await viewer_likes)
+        for post in posts:
+            post.liked_by_user = post.pk in liked_post_ids
+
+    serializer = PostListSerializer(posts, many=True, context={"request": request})
+    return json_response(serializer.data)
+
+
+def _posts(request, serializer_class):
+    return post_queryset(serializer_class.selected_fields(request))
+
+
+@jwt_profile_required
+@throttled(PostViewSet)
+@async_conditional_get(versioning.post_list_keys)
+async def post_list(request, profile):
+    """Async version of the post list endpoint"""
+    return await _post_list_response(
+        request, profile, filter_posts(_posts(request, PostListSerializer), request.GET)
+    )
+
+
+@jwt_profile_required
+@throttled(PostViewSet)
+@async_conditional_get(versioning.feed_keys)
+async def post_feed(request, profile):
+    """Async version of the feed endpoint"""
+    followed_profiles = await sync_to_async(follow_graph.following_ids)(profile.id)
+    return await _post_list_response(
+        request,
+        profile,
+        filter_posts(
+            _posts(request, PostListSerializer).filter(
+                author__in=list(followed_profiles)
+            ),
+            request.GET,
+        ),
+    )
+
+
+@jwt_profile_required
+@throttled(PostViewSet)
+@async_conditional_get(versioning.post_detail_keys)
+async def post_detail(request, profile, pk):
+    """Async version of the post detail endpoint"""
+    viewer_likes = None
+    if "liked_by_user" in PostDetailSerializer.selected_fields(request):
+        viewer_likes = start_on_own_connection(
+            Like.objects.filter(profile=profile, post_id=pk).values("pk")[:1]
+        )
+    try:
+        post = await _posts(request, PostDetailSerializer).aget(pk=pk)
+    except Post.DoesNotExist:
+        if viewer_likes is not None:
+            viewer_likes.cancel()
+        return json_response({"detail": "Not found."}, status.HTTP_404_NOT_FOUND)
+    if viewer_likes is not None:
+        post.liked_by_user = bool(await viewer_likes)
+
+    serializer = PostDetailSerializer(post, context={"request": request})
+    return json_response(serializer.data)
+
+
+@jwt_profile_required
+@throttled(ProfileViewSet)
+@async_conditional_get(versioning.profile_list_keys)
+async def profile_list(request, profile):
+    """Async version of the profile list endpoint"""
+    fields = ProfileListSerializer.selected_fields(request)
+    queryset = filter_profiles(profile_queryset(fields), request.GET).order_by(
+        *profile_ordering(request)
+    )
+    paginator = ProfileCursorPagination()
+    page = paginator.page_queryset(queryset, request)
+    if page is not None:
+        queryset = page
+    viewer_follows = None
+    if "followed_by_me" in fields:
+        viewer_follows = start_on_own_connection(
+            FollowingRelationships.objects.filter(
+                follower=profile, following__in=queryset.values("pk")
+            ).values_list("following_id", flat=True)
+        )
+    profiles = await fetch_rows(queryset)
+    if page is not None:
+        profiles = paginator.page_rows(profiles)
+    if viewer_follows is not None:
+        followed_profile_ids = set(await viewer_follows)
+        for listed_profile in profiles:
+            listed_profile.followed_by_me = listed_profile.pk in followed_profile_ids
+
+    serializer = ProfileListSerializer(
+        profiles, many=True, context={"request": request}
+    )
+    if page is not None:
+        return json_response(paginator.get_paginated_response(serializer.data).data)
+    return json_response(serializer.data)
+
+
+@jwt_profile_required
+@throttled(ProfileViewSet)
+@async_conditional_get(versioning.profile_detail_keys)
+async def profile_detail(request, profile, pk):
+    """Async version of the profile detail endpoint"""
+    fields = ProfileDetailSerializer.selected_fields(request)
+    try:
+        detail = await profile_queryset(fields).aget(pk=pk)
+    except Profile.DoesNotExist:
+        return json_response({"detail": "Not found."}, status.HTTP_404_NOT_FOUND)
+
+    serializer = ProfileDetailSerializer(detail, context={"request": request})
+    return json_response(serializer.data)
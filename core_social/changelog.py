@@ -0,0 +1,77 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Min, Q
+from django.utils import timezone
+
+from core_social.models import ChangeLogEntry
+
+
+def record(kind, profile_id, post_id=None):
+    ChangeLogEntry.objects.create(kind=kind, profile_id=profile_id, post_id=post_id)
+
+
+def record_many(kind, rows):
+    """Record an entry for each (profile_id, post_id) pair in one insert"""
+    ChangeLogEntry.objects.bulk_create(
+        ChangeLogEntry(kind=kind, profile_id=profile_id, post_id=post_id)
+        for profile_id, post_id in rows
+    )
+
+
+def current_cursor():
+    """
+    Id of the newest entry older than COMMIT_LAG_SECONDS. Newer ids may
+    still be joined by lower ones whose transaction commits later, so
+    they are returned again after the cursor instead of being skipped.
+    """
+    settled_before = timezone.now() - timedelta(
+        seconds=settings.FEED_CHANGES["COMMIT_LAG_SECONDS"]
+    )
+    newest = (
+        ChangeLogEntry.objects.filter(created_at__lte=settled_before)
+        .order_by("-id")
+        .values_list("id", flat=True)
+        .first()
+    )
+    return newest or 0
+
+
+def is_pruned(cursor):
+    """Whether entries after the cursor may have been pruned already"""
+    oldest = ChangeLogEntry.objects.aggregate(oldest=Min("id"))["oldest"]
+    return oldest is not None and cursor < oldest - 1
+
+
+def entries_since(cursor, profile_id, following):
+    """Entries after the cursor of the followed authors' posts and own follows"""
+    return (
+        ChangeLogEntry.objects.filter(
+            Q(profile_id__in=list(following))
+            | Q(profile_id=profile_id, kind=ChangeLogEntry.FOLLOWING_CHANGED),
+            id__gt=cursor,
+        )
+        .order_by("id")
+        .values_list("kind", "post_id")
+    )
+
+
+def prune():
+    """
+    Delete the entries older than RETENTION_HOURS, a batch at a time.
+    The newest entry is kept so is_pruned can tell what was deleted.
+    """
+    config = settings.FEED_CHANGES
+    expired_before = timezone.now() - timedelta(hours=config["RETENTION_HOURS"])
+    newest = ChangeLogEntry.objects.order_by("-id").values_list("id", flat=True).first()
+    deleted = 0
+    while newest is not None:
+        batch = list(
+            ChangeLogEntry.objects.filter(created_at__lt=expired_before, id__lt=newest)
+            .order_by("id")
+            .values_list("id", flat=True)[: config["PRUNE_BATCH_SIZE"]]
+        )
+        if not batch:
+            break
+        deleted += ChangeLogEntry.objects.filter(id__in=batch).delete()[0]
+    return deleted
@@ -0,0 +1,55 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+
+def _split(value):
+    if value is None:
+        return None
+    return {name.strip() for name in value.split(",") if name.strip()}
+
+
+def _check_known(param, names, known):
+    unknown = names - set(known)
+    if unknown:
+        raise ValidationError(
+            {param: [f"Unknown fields: {', '.join(sorted(unknown))}."]}
+        )
+
+
+class SparseFieldsetMixin:
+    """
+    Limit the fields of a serializer to the ones selected by the request:
+    ?fields= lists the fields to return, ?include= the embedded lists
+    (embedded_fields) to return, all of them by default. Unknown names
+    are rejected. Writes always use every field.
+    """
+
+    embedded_fields = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        if request is None:
+            return
+        selected = self.selected_fields(request)
+        for name in list(self.fields):
+            if name not in selected:
+                self.fields.pop(name)
+
+    @classmethod
+    def selected_fields(cls, request):
+        """Names of the fields selected by the request"""
+        selected = set(cls.Meta.fields)
+        if request.method not in SAFE_METHODS:
+            return selected
+
+        query_params = getattr(request, "query_params", request.GET)
+        fields = _split(query_params.get("fields"))
+        if fields:
+            _check_known("fields", fields, cls.Meta.fields)
+            selected &= fields
+        include = _split(query_params.get("include"))
+        if include is not None:
+            _check_known("include", include, cls.embedded_fields)
+            selected -= set(cls.embedded_fields) - include
+        return selected
@@ -0,0 +1,46 @@
+from core_social.tags import normalize_tag
+
+
+def filter_username_prefix(queryset, prefix):
+    """Profiles whose username starts with prefix, ignoring case and a leading @"""
+    prefix = prefix.strip().lstrip("@").lower()
+    return queryset.filter(username_normalized__startswith=prefix)
+
+
+def filter_profiles(queryset, query_params):
+    """
+    Filter profiles by the username prefix and the first_name and last_name
+    parameters
+    """
+    username = query_params.get("username")
+    first_name = query_params.get("first_name")
+    last_name = query_params.get("last_name")
+
+    if username:
+        queryset = filter_username_prefix(queryset, username)
+
+    if first_name:
+        queryset = queryset.filter(first_name__icontains=first_name)
+
+    if last_name:
+        queryset = queryset.filter(last_name__icontains=last_name)
+
+    return queryset
+
+
+def filter_posts(queryset, query_params):
+    """Filter posts by the content, author_username and tag parameters"""
+    content = query_params.get("content")
+    author_username = query_params.get("author_username")
+    tag = query_params.get("tag")
+
+    if author_username is not None:
+        queryset = queryset.filter(author__username__icontains=author_username)
+
+    if content is not None:
+        queryset = queryset.filter(content__icontains=content)
+
+    if tag:
+        queryset = queryset.filter(post_hashtags__hashtag__name=normalize_tag(tag))
+
+    return queryset
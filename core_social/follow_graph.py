@@ -0,0 +1,132 @@
+import uuid
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from core_social.models import FollowingRelationships
+
+FOLLOWING = "following"
+FOLLOWERS = "followers"
+
+# Relationship column holding the profile and the column holding its neighbours
+_COLUMNS = {
+    FOLLOWING: ("follower_id", "following_id"),
+    FOLLOWERS: ("following_id", "follower_id"),
+}
+
+
+# Each adjacency list is cached under a generation token of its profile.
+# Writes drop the token once they commit, so a list loaded from before the
+# write is stored under a token nobody reads anymore. The lists must be seen
+# by every process, so they are only cached with SHARED_CACHE
+
+
+def _generation_key(direction, profile_id):
+    return f"follow-graph-generation:{direction}:{profile_id}"
+
+
+def _key(direction, profile_id, generation):
+    return f"follow-graph:{direction}:{profile_id}:{generation}"
+
+
+def _decode(value):
+    ids = array("q")
+    ids.frombytes(value)
+    return ids
+
+
+def _generations(direction, profile_ids):
+    """The current generation token of each profile's list"""
+    keys = {
+        _generation_key(direction, profile_id): profile_id for profile_id in profile_ids
+    }
+    found = cache.get_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, timeout=settings.FOLLOW_GRAPH_TIMEOUT)
+        found.update(missing)
+    return {keys[key]: generation for key, generation in found.items()}
+
+
+def _read(direction, profile_ids):
+    """
+    Read the neighbour id sets of profiles. They are read from the primary
+    so a lagging replica's view isn't cached for the timeout.
+    """
+    own_column, neighbour_column = _COLUMNS[direction]
+    neighbours = {profile_id: [] for profile_id in profile_ids}
+    rows = (
+        FollowingRelationships.objects.using(DEFAULT_DB_ALIAS)
+        .filter(**{f"{own_column}__in": profile_ids})
+        .order_by()
+        .values_list(own_column, neighbour_column)
+    )
+    for profile_id, neighbour_id in rows:
+        neighbours[profile_id].append(neighbour_id)
+    return {
+        profile_id: array("q", sorted(ids)) for profile_id, ids in neighbours.items()
+    }
+
+
+def neighbour_ids(direction, profile_ids):
+    """Return a sorted id array of the neighbours of each profile"""
+    profile_ids = list(profile_ids)
+    if not settings.SHARED_CACHE:
+        return _read(direction, profile_ids)
+
+    generations = _generations(direction, profile_ids)
+    keys = {
+        _key(direction, profile_id, generations[profile_id]): profile_id
+        for profile_id in profile_ids
+    }
+    cached = cache.get_many(keys)
+    found = {keys[key]: _decode(value) for key, value in cached.items()}
+    missing = [profile_id for profile_id in profile_ids if profile_id not in found]
+    if missing:
+        loaded = _read(direction, missing)
+        cache.set_many(
+            {
+                _key(direction, profile_id, generations[profile_id]): ids.tobytes()
+                for profile_id, ids in loaded.items()
+            },
+            timeout=settings.FOLLOW_GRAPH_TIMEOUT,
+        )
+        found.update(loaded)
+    return found
+
+
+def following_ids(profile_id):
+    """Sorted ids of the profiles the profile follows"""
+    return neighbour_ids(FOLLOWING, [profile_id])[profile_id]
+
+
+def follower_ids(profile_id):
+    """Sorted ids of the profiles following the profile"""
+    return neighbour_ids(FOLLOWERS, [profile_id])[profile_id]
+
+
+def contains(ids, profile_id):
+    index = bisect_left(ids, profile_id)
+    return index < len(ids) and ids[index] == profile_id
+
+
+def _invalidate(follower_id, following_id):
+    cache.delete_many(
+        [
+            _generation_key(FOLLOWING, follower_id),
+            _generation_key(FOLLOWERS, following_id),
+        ]
+    )
+
+
+def add_follow(follower_id, following_id):
+    """Drop the cached lists of both profiles once the transaction commits"""
+    transaction.on_commit(lambda: _invalidate(follower_id, following_id))
+
+
+def remove_follow(follower_id, following_id):
+    """Drop the cached lists of both profiles once the transaction commits"""
+    transaction.on_commit(lambda: _invalidate(follower_id, following_id))
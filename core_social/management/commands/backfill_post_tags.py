@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core_social.models import Post
+from core_social.tags import index_posts
+
+
+class Command(BaseCommand):
+    help = "Indexes the hashtags and mentions of existing posts"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.HASHTAGS["BACKFILL_BATCH_SIZE"],
+            help="Number of posts indexed per transaction",
+        )
+
+    def handle(self, *args, **kwargs):
+        last_id = 0
+        indexed = 0
+        while True:
+            batch = list(
+                Post.objects.filter(id__gt=last_id)
+                .order_by("id")
+                .only("id", "content")[: kwargs["batch_size"]]
+            )
+            if not batch:
+                break
+            index_posts(batch)
+            last_id = batch[-1].id
+            indexed += len(batch)
+            self.stdout.write(f"Indexed {indexed} posts")
+        self.stdout.write(self.style.SUCCESS(f"Successfully indexed {indexed} posts"))
@@ -0,0 +1,93 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Run in a fresh interpreter per sample, so every import is a cold one.
+# Each program loads what the process type loads before serving its first
+# request or task.
+PROCESS_TYPES = {
+    "wsgi": (
+        "import social_media_api.wsgi\n"
+        "from django.urls import get_resolver\n"
+        "get_resolver().url_patterns\n"
+    ),
+    "asgi": (
+        "import social_media_api.asgi\n"
+        "from django.urls import get_resolver\n"
+        "get_resolver().url_patterns\n"
+    ),
+    "worker": (
+        "from social_media_api.celery import app\n"
+        "app.loader.import_default_modules()\n"
+    ),
+}
+
+MEASURE = """
+import json, resource, sys, time
+start = time.perf_counter()
+exec(compile({program!r}, "<startup>", "exec"))
+print(json.dumps({{
+    "import_ms": (time.perf_counter() - start) * 1000,
+    "rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "modules": len(sys.modules),
+}}))
+"""
+
+
+class Command(BaseCommand):
+    help = "Measures the import time and memory of each process type at startup"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--process",
+            choices=sorted(PROCESS_TYPES),
+            action="append",
+            help="Process type to measure, all by default",
+        )
+        parser.add_argument(
+            "--profile",
+            help="SETTINGS_PROFILE of the measured processes, the current one by default",
+        )
+        parser.add_argument(
+            "--samples",
+            type=int,
+            default=5,
+            help="Processes started per process type, the median is reported",
+        )
+
+    def sample(self, program, env):
+        result = subprocess.run(
+            [sys.executable, "-c", MEASURE.format(program=program)],
+            env=env,
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def handle(self, *args, **kwargs):
+        env = {
+            **os.environ,
+            "SETTINGS_PROFILE": kwargs["profile"] or settings.SETTINGS_PROFILE,
+            "DJANGO_SETTINGS_MODULE": os.environ.get(
+                "DJANGO_SETTINGS_MODULE", "social_media_api.settings"
+            ),
+        }
+        self.stdout.write(f"Settings profile: {env['SETTINGS_PROFILE']}")
+        for process in kwargs["process"] or sorted(PROCESS_TYPES):
+            samples = [
+                self.sample(PROCESS_TYPES[process], env)
+                for _ in range(kwargs["samples"])
+            ]
+            self.stdout.write(
+                f"{process}: "
+                f"import {statistics.median(s['import_ms'] for s in samples):.0f} ms, "
+                f"RSS {statistics.median(s['rss_kb'] for s in samples) / 1024:.1f} MiB, "
+                f"{statistics.median(s['modules'] for s in samples):.0f} modules"
+            )
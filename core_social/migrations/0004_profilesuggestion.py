@@ -0,0 +1,54 @@
+# Generated by Django 4.2.6 on 2026-10-19 09:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core_social", "0003_post_scheduled_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProfileSuggestion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("score", models.PositiveIntegerField()),
+                ("rank", models.PositiveSmallIntegerField()),
+                (
+                    "profile",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="suggestions",
+                        to="core_social.profile",
+                    ),
+                ),
+                (
+                    "suggested",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="core_social.profile",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["rank"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="profilesuggestion",
+            constraint=models.UniqueConstraint(
+                fields=("profile", "rank"), name="unique_profile_suggestion_rank"
+            ),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.6 on 2026-10-19 09:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core_social", "0004_profilesuggestion"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PostTrendingScore",
+            fields=[
+                (
+                    "post",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="trending_score",
+                        serialize=False,
+                        to="core_social.post",
+                    ),
+                ),
+                ("score", models.FloatField(db_index=True)),
+            ],
+        ),
+    ]
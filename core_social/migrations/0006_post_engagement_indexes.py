@@ -0,0 +1,24 @@
+# Generated by Django 4.2.6 on 2026-10-19 09:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core_social", "0005_posttrendingscore"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["post", "-commented_at", "-id"], name="comment_post_recent_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="like",
+            index=models.Index(
+                fields=["post", "-liked_at", "-id"], name="like_post_recent_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.6 on 2026-10-19 09:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core_social", "0006_post_engagement_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChangeLogEntry",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("post_created", "Post created"),
+                            ("post_updated", "Post updated"),
+                            ("post_deleted", "Post deleted"),
+                            ("engagement", "Likes or comments changed"),
+                            ("following_changed", "Followed profiles changed"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("post_id", models.BigIntegerField(blank=True, null=True)),
+                ("profile_id", models.BigIntegerField()),
+                ("created_at", models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["profile_id", "id"], name="changelog_profile_id_idx"
+                    )
+                ],
+            },
+        ),
+    ]
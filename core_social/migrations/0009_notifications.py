@@ -0,0 +1,106 @@
+# Generated by Django 4.2.6 on 2026-10-19 09:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core_social", "0008_accountdeletion"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NotificationEvent",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("recipient_id", models.BigIntegerField()),
+                ("actor_id", models.BigIntegerField()),
+                (
+                    "verb",
+                    models.CharField(
+                        choices=[
+                            ("like", "Liked your post"),
+                            ("comment", "Commented on your post"),
+                            ("follow", "Followed you"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("post_id", models.BigIntegerField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Notification",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "verb",
+                    models.CharField(
+                        choices=[
+                            ("like", "Liked your post"),
+                            ("comment", "Commented on your post"),
+                            ("follow", "Followed you"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("actor_count", models.PositiveIntegerField(default=1)),
+                ("recent_actor_ids", models.JSONField(blank=True, default=list)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("read_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "latest_actor",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="core_social.profile",
+                    ),
+                ),
+                (
+                    "post",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="core_social.post",
+                    ),
+                ),
+                (
+                    "recipient",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="notifications",
+                        to="core_social.profile",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["recipient", "-updated_at", "-id"],
+                        name="notification_recent_idx",
+                    ),
+                    models.Index(
+                        condition=models.Q(("read_at__isnull", True)),
+                        fields=["recipient"],
+                        name="notification_unread_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
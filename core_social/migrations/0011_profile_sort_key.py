@@ -0,0 +1,46 @@
+# Generated by Django 4.2.6 on 2026-10-19 09:29
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def fill_sort_keys(apps, schema_editor):
+    Profile = apps.get_model("core_social", "Profile")
+    last_id = 0
+    while True:
+        profiles = list(
+            Profile.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .only("id", "first_name", "last_name")[:BATCH_SIZE]
+        )
+        if not profiles:
+            break
+        for profile in profiles:
+            name = f"{profile.first_name} {profile.last_name}"
+            profile.sort_key = name.strip().casefold()[:101]
+        Profile.objects.bulk_update(profiles, ["sort_key"])
+        last_id = profiles[-1].id
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core_social", "0010_outboxmessage"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="profile",
+            options={"verbose_name_plural": "profiles"},
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="sort_key",
+            field=models.CharField(blank=True, editable=False, max_length=101),
+        ),
+        migrations.RunPython(fill_sort_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="profile",
+            index=models.Index(fields=["sort_key", "id"], name="profile_sort_key_idx"),
+        ),
+    ]
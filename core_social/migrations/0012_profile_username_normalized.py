@@ -0,0 +1,52 @@
+# Generated by Django 4.2.6 on 2026-10-19 09:31
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def fill_usernames(apps, schema_editor):
+    """
+    Case-insensitive duplicates keep the username of the oldest profile
+    only, the others stay unset until their username is changed.
+    """
+    Profile = apps.get_model("core_social", "Profile")
+    last_id = 0
+    while True:
+        profiles = list(
+            Profile.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .only("id", "username")[:BATCH_SIZE]
+        )
+        if not profiles:
+            break
+        keys = {profile.username.strip().lower() for profile in profiles} - {""}
+        taken = set(
+            Profile.objects.filter(username_normalized__in=keys).values_list(
+                "username_normalized", flat=True
+            )
+        )
+        for profile in profiles:
+            key = profile.username.strip().lower()
+            if key and key not in taken:
+                profile.username_normalized = key
+                taken.add(key)
+        Profile.objects.bulk_update(profiles, ["username_normalized"])
+        last_id = profiles[-1].id
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core_social", "0011_profile_sort_key"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="profile",
+            name="username_normalized",
+            field=models.CharField(
+                blank=True, editable=False, max_length=50, null=True, unique=True
+            ),
+        ),
+        migrations.RunPython(fill_usernames, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,107 @@
+# Generated by Django 4.2.6 on 2026-10-19 09:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core_social", "0012_profile_username_normalized"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Hashtag",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100, unique=True)),
+                ("post_count", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="PostMention",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "post",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="mentions",
+                        to="core_social.post",
+                    ),
+                ),
+                (
+                    "profile",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="mentions",
+                        to="core_social.profile",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="PostHashtag",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "hashtag",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="post_hashtags",
+                        to="core_social.hashtag",
+                    ),
+                ),
+                (
+                    "post",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="post_hashtags",
+                        to="core_social.post",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="hashtag",
+            index=models.Index(
+                fields=["-post_count", "name"], name="hashtag_post_count_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="postmention",
+            constraint=models.UniqueConstraint(
+                fields=("profile", "post"), name="unique_post_mention"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="posthashtag",
+            constraint=models.UniqueConstraint(
+                fields=("hashtag", "post"), name="unique_post_hashtag"
+            ),
+        ),
+    ]
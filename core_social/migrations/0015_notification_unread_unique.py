@@ -0,0 +1,56 @@
+# Generated by Django 4.2.6 on 2026-10-19 09:51
+
+from django.db import migrations, models
+from django.utils import timezone
+import django.db.models.functions.comparison
+
+BATCH_SIZE = 1000
+
+
+def mark_duplicates_read(apps, schema_editor):
+    """
+    Concurrent deliveries may have created several unread notifications of
+    the same recipient, verb and post. All but the latest are marked read.
+    """
+    Notification = apps.get_model("core_social", "Notification")
+    latest = {}
+    duplicates = []
+    unread = (
+        Notification.objects.filter(read_at__isnull=True)
+        .order_by("-updated_at", "-id")
+        .values_list("id", "recipient_id", "verb", "post_id")
+    )
+    for notification_id, *key in unread.iterator():
+        if tuple(key) in latest:
+            duplicates.append(notification_id)
+        else:
+            latest[tuple(key)] = notification_id
+    now = timezone.now()
+    for start in range(0, len(duplicates), BATCH_SIZE):
+        Notification.objects.filter(
+            id__in=duplicates[start : start + BATCH_SIZE]
+        ).update(read_at=now)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core_social", "0013_hashtags_mentions"),
+    ]
+
+    operations = [
+        migrations.RunPython(mark_duplicates_read, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name="notification",
+            name="notification_unread_idx",
+        ),
+        migrations.AddConstraint(
+            model_name="notification",
+            constraint=models.UniqueConstraint(
+                models.F("recipient"),
+                models.F("verb"),
+                django.db.models.functions.comparison.Coalesce("post", 0),
+                condition=models.Q(("read_at__isnull", True)),
+                name="notification_unread_unique",
+            ),
+        ),
+    ]
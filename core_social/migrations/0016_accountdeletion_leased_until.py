@@ -0,0 +1,17 @@
+# Generated by Django 4.2.6 on 2026-10-19 09:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core_social", "0015_notification_unread_unique"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="accountdeletion",
+            name="leased_until",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.6 on 2026-10-19 09:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core_social", "0016_accountdeletion_leased_until"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrendingRefresh",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("watermark", models.DateTimeField()),
+                ("rebuilt_at", models.DateTimeField()),
+            ],
+        ),
+    ]
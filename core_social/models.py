@@ -1,9 +1,87 @@
 from django.db import models
+from django.db.models import Count, OuterRef, Prefetch, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
 
 from core_social.upload_to_path import UploadToPath
 
 
+def profile_sort_key(first_name, last_name):
+    """Case-insensitive key profiles are listed by, one indexed column"""
+    return f"{first_name} {last_name}".strip().casefold()[:101]
+
+
+def normalize_username(username):
+    """Lowercase username profiles are looked up by, None while unset"""
+    return username.strip().lower() or None
+
+
+class ProfileQuerySet(models.QuerySet):
+    def active(self):
+        """Profiles whose user was not deactivated by an account deletion"""
+        return self.filter(user__is_active=True)
+
+    def with_followers_count(self):
+        return self.annotate(
+            followers_count=Coalesce(
+                Subquery(
+                    FollowingRelationships.objects.filter(following=OuterRef("pk"))
+                    .values("following")
+                    .annotate(cnt=Count("pk"))
+                    .values("cnt")
+                ),
+                0,
+            )
+        )
+
+    def with_following_count(self):
+        return self.annotate(
+            following_count=Coalesce(
+                Subquery(
+                    FollowingRelationships.objects.filter(follower=OuterRef("pk"))
+                    .values("follower")
+                    .annotate(cnt=Count("pk"))
+                    .values("cnt")
+                ),
+                0,
+            )
+        )
+
+    def with_recent_followers(self):
+        """Prefetch the newest followers into recent_followers"""
+        return self.prefetch_related(
+            Prefetch(
+                "followers",
+                queryset=FollowingRelationships.objects.filter(
+                    follower__user__is_active=True
+                )
+                .select_related("follower")
+                .order_by("-followed_at", "-id")[
+                    : settings.PROFILE_DETAIL["RELATIONSHIPS_LIMIT"]
+                ],
+                to_attr="recent_followers",
+            )
+        )
+
+    def with_recent_following(self):
+        """Prefetch the newest followed profiles into recent_following"""
+        return self.prefetch_related(
+            Prefetch(
+                "following",
+                queryset=FollowingRelationships.objects.filter(
+                    following__user__is_active=True
+                )
+                .select_related("following")
+                .order_by("-followed_at", "-id")[
+                    : settings.PROFILE_DETAIL["RELATIONSHIPS_LIMIT"]
+                ],
+                to_attr="recent_following",
+            )
+        )
+
+
 class Profile(models.Model):
     user = models.OneToOneField(
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="profile"
@@ -17,14 +95,58 @@ class Profile(models.Model):
     profile_image = models.ImageField(
         blank=True, null=True, upload_to=UploadToPath("profile-images/")
     )
+    sort_key = models.CharField(max_length=101, blank=True, editable=False)
+    username_normalized = models.CharField(
+        max_length=50, unique=True, null=True, blank=True, editable=False
+    )
+
+    objects = ProfileQuerySet.as_manager()
 
     @property
     def full_name(self):
         return f"{self.first_name} {self.last_name}"
 
     class Meta:
-        ordering = ["first_name", "last_name"]
         verbose_name_plural = "profiles"
+        indexes = [
+            models.Index(fields=["sort_key", "id"], name="profile_sort_key_idx"),
+        ]
+
+    # Columns derived from the fields, saved along with them
+    DERIVED_FIELDS = {
+        "first_name": "sort_key",
+        "last_name": "sort_key",
+        "username": "username_normalized",
+    }
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        profile = super().from_db(db, field_names, values)
+        profile._saved_username = profile.__dict__.get("username")
+        return profile
+
+    def save(self, *args, **kwargs):
+        self.sort_key = profile_sort_key(self.first_name, self.last_name)
+        update_fields = kwargs.get("update_fields")
+        # Only a username being written is normalized again, so saving other
+        # fields never fails on a username left unset by a duplicate
+        if (
+            self._state.adding
+            or self.username != getattr(self, "_saved_username", None)
+            or (update_fields is not None and "username" in update_fields)
+        ):
+            self.username_normalized = normalize_username(self.username)
+        if update_fields is not None:
+            kwargs["update_fields"] = {
+                *update_fields,
+                *(
+                    self.DERIVED_FIELDS[field]
+                    for field in update_fields
+                    if field in self.DERIVED_FIELDS
+                ),
+            }
+        super().save(*args, **kwargs)
+        self._saved_username = self.username
 
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.username})"
@@ -46,6 +168,86 @@ class FollowingRelationships(models.Model):
         return f"{self.follower} follows {self.following}"
 
 
+class ProfileSuggestion(models.Model):
+    """A precomputed "who to follow" candidate, see core_social.suggestions"""
+
+    profile = models.ForeignKey(
+        Profile, on_delete=models.CASCADE, related_name="suggestions"
+    )
+    suggested = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name="+")
+    score = models.PositiveIntegerField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        ordering = ["rank"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["profile", "rank"], name="unique_profile_suggestion_rank"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.suggested} suggested to {self.profile}"
+
+
+class PostQuerySet(models.QuerySet):
+    def active(self):
+        """Posts whose author's user was not deactivated by an account deletion"""
+        return self.filter(author__user__is_active=True)
+
+    def with_likes_count(self):
+        return self.annotate(
+            likes_count=Subquery(
+                Like.objects.filter(post=OuterRef("pk"))
+                .values("post")
+                .annotate(cnt=Count("post"))
+                .values("cnt")
+            )
+        )
+
+    def with_comments_count(self):
+        return self.annotate(
+            comments_count=Subquery(
+                Comment.objects.filter(post=OuterRef("pk"))
+                .values("post")
+                .annotate(cnt=Count("post"))
+                .values("cnt")
+            )
+        )
+
+    def with_counts(self):
+        """Annotate posts with the number of their likes and comments"""
+        return self.with_likes_count().with_comments_count()
+
+    def with_recent_likes(self):
+        """Prefetch the newest likes into recent_likes"""
+        return self.prefetch_related(
+            Prefetch(
+                "likes",
+                queryset=Like.objects.select_related("profile").order_by(
+                    "-liked_at", "-id"
+                )[: settings.POST_ENGAGEMENT["DETAIL_LIMIT"]],
+                to_attr="recent_likes",
+            )
+        )
+
+    def with_recent_comments(self):
+        """Prefetch the newest comments into recent_comments"""
+        return self.prefetch_related(
+            Prefetch(
+                "comments",
+                queryset=Comment.objects.select_related("author").order_by(
+                    "-commented_at", "-id"
+                )[: settings.POST_ENGAGEMENT["DETAIL_LIMIT"]],
+                to_attr="recent_comments",
+            )
+        )
+
+    def with_recent_engagement(self):
+        """Prefetch the newest likes and comments into recent_likes/comments"""
+        return self.with_recent_likes().with_recent_comments()
+
+
 class Post(models.Model):
     author = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name="posts")
     content = models.TextField()
@@ -55,6 +257,8 @@ class Post(models.Model):
     )
     scheduled_at = models.DateTimeField(null=True, blank=True, default=None)
 
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         ordering = ["-created_at"]
 
@@ -72,6 +276,12 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ["-commented_at"]
+        indexes = [
+            models.Index(
+                fields=["post", "-commented_at", "-id"],
+                name="comment_post_recent_idx",
+            )
+        ]
 
     def __str__(self):
         return f"Comment by {self.author} at {self.commented_at}"
@@ -85,6 +295,257 @@ class Like(models.Model):
     class Meta:
         unique_together = ("profile", "post")
         ordering = ["-liked_at"]
+        indexes = [
+            models.Index(
+                fields=["post", "-liked_at", "-id"], name="like_post_recent_idx"
+            )
+        ]
 
     def __str__(self):
         return f"Like by {self.profile} at {self.liked_at}"
+
+
+class PostTrendingScore(models.Model):
+    """
+    Time-decayed engagement of a post, see core_social.trending.
+
+    The score is the log of the decayed engagement sum measured against a
+    fixed epoch, so stored scores stay comparable without being rewritten
+    as time passes.
+    """
+
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="trending_score",
+    )
+    score = models.FloatField(db_index=True)
+
+    def __str__(self):
+        return f"{self.post} scored {self.score}"
+
+
+class TrendingRefresh(models.Model):
+    """
+    Single row of core_social.trending: engagements up to watermark are
+    folded into the scores, which were last rebuilt at rebuilt_at. It is
+    updated in the transaction writing the scores.
+    """
+
+    watermark = models.DateTimeField()
+    rebuilt_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Trending scores up to {self.watermark}"
+
+
+class Hashtag(models.Model):
+    """
+    A #tag used in posts, see core_social.tags. post_count counts the posts
+    using it and is kept up to date as posts are indexed, so the most used
+    tags are read off its index.
+    """
+
+    name = models.CharField(max_length=100, unique=True)
+    post_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-post_count", "name"], name="hashtag_post_count_idx")
+        ]
+
+    def __str__(self):
+        return f"#{self.name}"
+
+
+class PostHashtag(models.Model):
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="post_hashtags"
+    )
+    hashtag = models.ForeignKey(
+        Hashtag, on_delete=models.CASCADE, related_name="post_hashtags"
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["hashtag", "post"], name="unique_post_hashtag"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.hashtag} in post {self.post_id}"
+
+
+class PostMention(models.Model):
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="mentions")
+    profile = models.ForeignKey(
+        Profile, on_delete=models.CASCADE, related_name="mentions"
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["profile", "post"], name="unique_post_mention"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.profile} mentioned in post {self.post_id}"
+
+
+class ChangeLogEntry(models.Model):
+    """
+    Append-only log of the writes shown in feeds, read by the feed's
+    ?since= mode. Ids are not foreign keys so entries outlive deleted posts.
+    """
+
+    POST_CREATED = "post_created"
+    POST_UPDATED = "post_updated"
+    POST_DELETED = "post_deleted"
+    ENGAGEMENT = "engagement"
+    FOLLOWING_CHANGED = "following_changed"
+    KIND_CHOICES = (
+        (POST_CREATED, "Post created"),
+        (POST_UPDATED, "Post updated"),
+        (POST_DELETED, "Post deleted"),
+        (ENGAGEMENT, "Likes or comments changed"),
+        (FOLLOWING_CHANGED, "Followed profiles changed"),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    post_id = models.BigIntegerField(null=True, blank=True)
+    # Author of the post, or the follower for following changes
+    profile_id = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["profile_id", "id"], name="changelog_profile_id_idx")
+        ]
+
+    def __str__(self):
+        return f"{self.kind} of post {self.post_id} at {self.created_at}"
+
+
+class Notification(models.Model):
+    """
+    Likes, comments or follows of a recipient coalesced while unread, see
+    core_social.notifications. actor_count counts the actors to show
+    "latest_actor and N others". Ids of the most recent actors are kept so
+    an actor acting again isn't counted twice. A recipient has at most one
+    unread notification per verb and post, follows having no post.
+    """
+
+    LIKE = "like"
+    COMMENT = "comment"
+    FOLLOW = "follow"
+    VERB_CHOICES = (
+        (LIKE, "Liked your post"),
+        (COMMENT, "Commented on your post"),
+        (FOLLOW, "Followed you"),
+    )
+
+    recipient = models.ForeignKey(
+        Profile, on_delete=models.CASCADE, related_name="notifications"
+    )
+    verb = models.CharField(max_length=10, choices=VERB_CHOICES)
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, null=True, blank=True, related_name="+"
+    )
+    latest_actor = models.ForeignKey(
+        Profile, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    actor_count = models.PositiveIntegerField(default=1)
+    recent_actor_ids = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+    read_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["recipient", "-updated_at", "-id"],
+                name="notification_recent_idx",
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                "recipient",
+                "verb",
+                Coalesce("post", 0),
+                condition=Q(read_at__isnull=True),
+                name="notification_unread_unique",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.verb} notification of {self.recipient}"
+
+
+class OutboxMessage(models.Model):
+    """
+    Side effect of a write, inserted in the write's transaction and relayed
+    to the topic's Celery task by core_social.outbox. Messages with a
+    dedup_key are added once while pending.
+    """
+
+    SCHEDULED_POST = "scheduled_post"
+    NOTIFICATION = "notification"
+    ACCOUNT_DELETION = "account_deletion"
+    MEDIA_DELETION = "media_deletion"
+    TOPIC_CHOICES = (
+        (SCHEDULED_POST, "Scheduled post"),
+        (NOTIFICATION, "Notification"),
+        (ACCOUNT_DELETION, "Account deletion"),
+        (MEDIA_DELETION, "Media deletion"),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    topic = models.CharField(max_length=20, choices=TOPIC_CHOICES)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    dedup_key = models.CharField(max_length=100, unique=True, null=True, blank=True)
+    available_at = models.DateTimeField(default=timezone.now, db_index=True)
+    dispatched_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.topic} message {self.id}"
+
+
+class AccountDeletion(models.Model):
+    """
+    Progress of an account purged in the background, see
+    core_social.account_deletion. The user is inactive until the purge
+    deletes it, progress counts the deleted rows of each step. A purge
+    holds the deletion until leased_until, so a redelivered message does
+    not purge the account concurrently.
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    STATUS_CHOICES = (
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+    )
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="deletion",
+    )
+    profile_id = models.BigIntegerField(unique=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    progress = models.JSONField(default=dict, blank=True)
+    requested_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    leased_until = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Deletion of profile {self.profile_id} ({self.status})"
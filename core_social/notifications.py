@@ -0,0 +1,148 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from core_social import outbox
+from core_social.models import Notification, OutboxMessage, Post, Profile
+
+
+def notify(verb, recipient_id, actor_id, post_id=None):
+    """Queue a notification of the recipient, unless it is about themselves"""
+    if recipient_id != actor_id:
+        outbox.enqueue(
+            OutboxMessage.NOTIFICATION,
+            {
+                "verb": verb,
+                "recipient_id": recipient_id,
+                "actor_id": actor_id,
+                "post_id": post_id,
+            },
+        )
+
+
+def _group(events):
+    """
+    Group events by recipient, verb and post, keeping each actor once in
+    the order of their latest event. Events of deleted profiles or posts
+    are dropped.
+    """
+    profile_ids = {event["actor_id"] for event in events} | {
+        event["recipient_id"] for event in events
+    }
+    post_ids = {event["post_id"] for event in events if event["post_id"] is not None}
+    existing_profiles = set(
+        Profile.objects.filter(id__in=profile_ids).values_list("id", flat=True)
+    )
+    existing_posts = set(
+        Post.objects.filter(id__in=post_ids).values_list("id", flat=True)
+    )
+
+    groups = {}
+    for event in events:
+        if (
+            event["actor_id"] not in existing_profiles
+            or event["recipient_id"] not in existing_profiles
+            or (event["post_id"] is not None and event["post_id"] not in existing_posts)
+        ):
+            continue
+        key = (event["recipient_id"], event["verb"], event["post_id"])
+        actors = groups.setdefault(key, {})
+        actors.pop(event["actor_id"], None)
+        actors[event["actor_id"]] = True
+    return groups
+
+
+def _coalesce(groups):
+    """
+    Fold the groups into the recipients' unread notifications. Missing ones
+    are inserted empty first, the unique unread constraint skipping those a
+    concurrent delivery inserted, then all are locked before being updated,
+    so concurrent deliveries to the same recipient add up. A notification
+    marked read between the insert and the lock is started over.
+    """
+    now = timezone.now()
+    Notification.objects.bulk_create(
+        [
+            Notification(
+                recipient_id=recipient_id,
+                verb=verb,
+                post_id=post_id,
+                latest_actor_id=next(iter(actors)),
+                actor_count=0,
+                recent_actor_ids=[],
+                updated_at=now,
+            )
+            for (recipient_id, verb, post_id), actors in groups.items()
+        ],
+        ignore_conflicts=True,
+    )
+    unread = (
+        Notification.objects.select_for_update()
+        .filter(
+            recipient_id__in={recipient_id for recipient_id, _, _ in groups},
+            verb__in={verb for _, verb, _ in groups},
+            read_at__isnull=True,
+        )
+        .order_by("id")
+    )
+    existing = {
+        (notification.recipient_id, notification.verb, notification.post_id): (
+            notification
+        )
+        for notification in unread
+    }
+
+    kept = settings.NOTIFICATIONS["RECENT_ACTORS"]
+    updated = []
+    started = []
+    for key, actors in groups.items():
+        actor_ids = list(actors)
+        notification = existing.get(key)
+        if notification is None:
+            recipient_id, verb, post_id = key
+            notification = Notification(
+                recipient_id=recipient_id,
+                verb=verb,
+                post_id=post_id,
+                actor_count=0,
+                recent_actor_ids=[],
+            )
+            started.append(notification)
+        else:
+            updated.append(notification)
+        recent = notification.recent_actor_ids
+        notification.actor_count += sum(
+            actor_id not in recent for actor_id in actor_ids
+        )
+        recent = [actor_id for actor_id in recent if actor_id not in actors]
+        notification.recent_actor_ids = (recent + actor_ids)[-kept:]
+        notification.latest_actor_id = actor_ids[-1]
+        notification.updated_at = now
+
+    Notification.objects.bulk_create(started)
+    Notification.objects.bulk_update(
+        updated, ["actor_count", "recent_actor_ids", "latest_actor", "updated_at"]
+    )
+    return len(started) + len(updated)
+
+
+def deliver(events):
+    """Coalesce notify() events into the recipients' notifications"""
+    groups = _group(events)
+    if not groups:
+        return 0
+    with transaction.atomic():
+        return _coalesce(groups)
+
+
+def unread_count(profile_id):
+    return Notification.objects.filter(
+        recipient_id=profile_id, read_at__isnull=True
+    ).count()
+
+
+def mark_read(profile_id):
+    """Mark the profile's notifications read, later events start new ones"""
+    return Notification.objects.filter(
+        recipient_id=profile_id, read_at__isnull=True
+    ).update(read_at=timezone.now())
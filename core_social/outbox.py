@@ -0,0 +1,112 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import timedelta
+
+from celery import current_app
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core_social.models import OutboxMessage
+
+# Task handling each topic, called with a list of message ids. Handlers
+# delete the messages they are done with, so a message relayed twice is
+# handled once.
+TOPIC_TASKS = {
+    OutboxMessage.SCHEDULED_POST: "core_social.tasks.publish_scheduled_posts",
+    OutboxMessage.NOTIFICATION: "core_social.tasks.deliver_notifications",
+    OutboxMessage.ACCOUNT_DELETION: "core_social.tasks.purge_accounts",
+    OutboxMessage.MEDIA_DELETION: "core_social.tasks.delete_media_files",
+}
+
+
+def enqueue(topic, payload, dedup_key=None, available_at=None):
+    """
+    Add a message in the current transaction, to be relayed once it
+    commits and available_at has passed.
+    """
+    OutboxMessage.objects.bulk_create(
+        [
+            OutboxMessage(
+                topic=topic,
+                payload=payload,
+                dedup_key=dedup_key,
+                available_at=available_at or timezone.now(),
+            )
+        ],
+        ignore_conflicts=dedup_key is not None,
+    )
+
+
+def relay():
+    """
+    Send the due messages to their topics' tasks, one task per topic and
+    batch of BATCH_SIZE messages. Messages still there REDELIVER_SECONDS
+    after being sent are sent again, so each is delivered at least once.
+    A batch is marked sent and committed before its tasks are published,
+    so a task never finds its messages still locked by the relay. Messages
+    whose task could not be published are unmarked.
+    """
+    config = settings.OUTBOX
+    now = timezone.now()
+    redeliver_before = now - timedelta(seconds=config["REDELIVER_SECONDS"])
+    due = OutboxMessage.objects.filter(
+        Q(dispatched_at__isnull=True) | Q(dispatched_at__lt=redeliver_before),
+        available_at__lte=now,
+    )
+    relayed = 0
+    for _ in range(config["MAX_BATCHES"]):
+        with transaction.atomic():
+            batch = list(
+                due.select_for_update(skip_locked=True)
+                .order_by("id")
+                .values_list("id", "topic")[: config["BATCH_SIZE"]]
+            )
+            if not batch:
+                break
+            OutboxMessage.objects.filter(
+                id__in=[message_id for message_id, _ in batch]
+            ).update(dispatched_at=now)
+        ids_by_topic = defaultdict(list)
+        for message_id, topic in batch:
+            ids_by_topic[topic].append(message_id)
+        unsent = list(ids_by_topic.items())
+        while unsent:
+            topic, ids = unsent[0]
+            try:
+                current_app.send_task(TOPIC_TASKS[topic], args=[ids])
+            except Exception:
+                OutboxMessage.objects.filter(
+                    id__in=[message_id for _, ids in unsent for message_id in ids],
+                    dispatched_at=now,
+                ).update(dispatched_at=None)
+                raise
+            unsent.pop(0)
+        relayed += len(batch)
+    return relayed
+
+
+def pending(topic, ids):
+    """The messages among ids still waiting to be handled"""
+    return list(OutboxMessage.objects.filter(topic=topic, id__in=ids).order_by("id"))
+
+
+@contextmanager
+def claim(topic, ids):
+    """
+    Lock the pending messages among ids and delete them along with the
+    changes made handling them, in one transaction.
+    """
+    with transaction.atomic():
+        messages = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True)
+            .filter(topic=topic, id__in=ids)
+            .order_by("id")
+        )
+        yield messages
+        complete(messages)
+
+
+def complete(messages):
+    OutboxMessage.objects.filter(id__in=[message.id for message in messages]).delete()
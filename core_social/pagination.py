@@ -0,0 +1,187 @@
+import json
+from base64 import b64decode, b64encode
+from binascii import Error as BinasciiError
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class EngagementCursorPagination(CursorPagination):
+    page_size_query_param = "page_size"
+
+    def __init__(self):
+        self.page_size = settings.POST_ENGAGEMENT["PAGE_SIZE"]
+        self.max_page_size = settings.POST_ENGAGEMENT["MAX_PAGE_SIZE"]
+
+
+class LikeCursorPagination(EngagementCursorPagination):
+    ordering = ("-liked_at", "-id")
+
+
+class CommentCursorPagination(EngagementCursorPagination):
+    ordering = ("-commented_at", "-id")
+
+
+class NotificationCursorPagination(CursorPagination):
+    ordering = ("-updated_at", "-id")
+    page_size_query_param = "page_size"
+
+    def __init__(self):
+        self.page_size = settings.NOTIFICATIONS["PAGE_SIZE"]
+        self.max_page_size = settings.NOTIFICATIONS["MAX_PAGE_SIZE"]
+
+
+# Orderings of the profile list by ?ordering=, each backed by an index
+PROFILE_ORDERINGS = {"name": ("sort_key", "id"), "id": ("id",)}
+
+
+def profile_ordering(request):
+    query_params = getattr(request, "query_params", request.GET)
+    return PROFILE_ORDERINGS.get(
+        query_params.get("ordering"), PROFILE_ORDERINGS["name"]
+    )
+
+
+def keyset_filter(ordering, position, reverse=False):
+    """
+    Rows after position, the ordering values of a row, in the ordering or
+    before it when reverse. The last field of the ordering must be unique.
+    """
+    lookup = "lt" if reverse else "gt"
+    condition = None
+    for field, value in reversed(list(zip(ordering, position))):
+        beyond = Q(**{f"{field}__{lookup}": value})
+        condition = (
+            beyond if condition is None else beyond | (Q(**{field: value}) & condition)
+        )
+    return condition
+
+
+class ProfileCursorPagination(BasePagination):
+    """
+    Keyset pages of the profile list in the ?ordering= order. The cursor
+    holds the ordering values of the row it starts after, ending with the
+    unique id, so pages stay exact however many profiles share a sort key.
+    The list is only paginated when ?cursor= or ?page_size= is given, so
+    it keeps its plain list shape otherwise. Async views page with
+    page_queryset and page_rows, fetching the rows in between.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_page_size(self, request):
+        config = settings.PROFILE_LIST
+        try:
+            query_params = getattr(request, "query_params", request.GET)
+            page_size = int(query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return config["PAGE_SIZE"]
+        return min(max(page_size, 1), config["MAX_PAGE_SIZE"])
+
+    def decode_cursor(self, request):
+        query_params = getattr(request, "query_params", request.GET)
+        encoded = query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return False, None
+        try:
+            cursor = json.loads(b64decode(encoded.encode("ascii")))
+            reverse, position = bool(cursor["r"]), list(cursor["p"])
+        except (BinasciiError, KeyError, TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return reverse, position
+
+    def encode_cursor(self, row, reverse):
+        position = [getattr(row, field) for field in self.ordering]
+        cursor = json.dumps({"r": int(reverse), "p": position})
+        encoded = b64encode(cursor.encode()).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.page_queryset(queryset, request)
+        if queryset is None:
+            return None
+        return self.page_rows(list(queryset))
+
+    def page_queryset(self, queryset, request):
+        """The rows of the requested page and the first of the next one"""
+        params = getattr(request, "query_params", request.GET)
+        if self.cursor_query_param not in params and (
+            self.page_size_query_param not in params
+        ):
+            return None
+        self.ordering = profile_ordering(request)
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.reverse, self.position = self.decode_cursor(request)
+
+        if self.position is not None:
+            queryset = queryset.filter(
+                keyset_filter(self.ordering, self.position, self.reverse)
+            )
+        order = [f"-{field}" if self.reverse else field for field in self.ordering]
+        return queryset.order_by(*order)[: self.page_size + 1]
+
+    def page_rows(self, rows):
+        """The page of the rows fetched from page_queryset, setting its links"""
+        reverse, position = self.reverse, self.position
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.next_link = self.previous_link = None
+        has_next = position is not None if reverse else has_more
+        has_previous = has_more if reverse else position is not None
+        if rows and has_next:
+            self.next_link = self.encode_cursor(rows[-1], reverse=False)
+        if rows and has_previous:
+            self.previous_link = self.encode_cursor(rows[0], reverse=True)
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ("next", self.next_link),
+                    ("previous", self.previous_link),
+                    ("results", data),
+                ]
+            )
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "The pagination cursor value.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Number of results to return per page.",
+                "schema": {"type": "integer"},
+            },
+        ]
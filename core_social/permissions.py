@@ -11,4 +11,4 @@ class IsAuthorOrReadOnly(permissions.BasePermission):
         if request.method in permissions.SAFE_METHODS:
             return True
 
-        return obj.author == request.user.profile
+        return obj.author_id == request.user.profile.id
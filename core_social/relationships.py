@@ -0,0 +1,115 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from core_social import follow_graph
+from core_social.models import Like
+
+# Marks a viewer whose id set exceeds MAX_IDS and is looked up per page
+TOO_LARGE = object()
+
+
+class ViewerIdCache:
+    """
+    In-process LRU of per-viewer id sets of liked posts.
+
+    At most MAX_VIEWERS sets of up to MAX_IDS ids are kept for TTL seconds.
+    Writes of this process update the sets in place, writes of other
+    processes become visible when the entry expires.
+    """
+
+    def __init__(self, load_ids):
+        self.load_ids = load_ids
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    @property
+    def config(self):
+        return settings.VIEWER_RELATIONSHIP_CACHE
+
+    def get(self, viewer_id):
+        """Return the viewer's id set, TOO_LARGE or None if caching is off"""
+        config = self.config
+        if not config["MAX_VIEWERS"]:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(viewer_id)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(viewer_id)
+                return entry[0]
+
+        ids = list(self.load_ids(viewer_id)[: config["MAX_IDS"] + 1])
+        ids = set(ids) if len(ids) <= config["MAX_IDS"] else TOO_LARGE
+        with self._lock:
+            self._entries[viewer_id] = (ids, time.monotonic() + config["TTL"])
+            self._entries.move_to_end(viewer_id)
+            while len(self._entries) > config["MAX_VIEWERS"]:
+                self._entries.popitem(last=False)
+        return ids
+
+    def add(self, viewer_id, object_id):
+        with self._lock:
+            entry = self._entries.get(viewer_id)
+            if entry is None or entry[0] is TOO_LARGE:
+                return
+            if len(entry[0]) >= self.config["MAX_IDS"]:
+                del self._entries[viewer_id]
+            else:
+                entry[0].add(object_id)
+
+    def discard(self, viewer_id, object_id):
+        with self._lock:
+            entry = self._entries.get(viewer_id)
+            if entry is not None and entry[0] is not TOO_LARGE:
+                entry[0].discard(object_id)
+
+
+liked_posts_cache = ViewerIdCache(
+    lambda profile_id: Like.objects.filter(profile_id=profile_id)
+    .order_by()
+    .values_list("post_id", flat=True)
+)
+
+
+def liked_post_ids(profile_id, post_ids):
+    """Return the ids among post_ids the profile has liked"""
+    liked = liked_posts_cache.get(profile_id)
+    if liked is None or liked is TOO_LARGE:
+        liked = Like.objects.filter(profile_id=profile_id, post_id__in=post_ids)
+        return set(liked.values_list("post_id", flat=True))
+    return liked.intersection(post_ids)
+
+
+def followed_profile_ids(profile_id, profile_ids):
+    """Return the ids among profile_ids the profile is following"""
+    following = follow_graph.following_ids(profile_id)
+    return {
+        listed_id
+        for listed_id in profile_ids
+        if follow_graph.contains(following, listed_id)
+    }
+
+
+def set_liked_by_user(posts, profile):
+    """Set liked_by_user on each post with one lookup for the whole page"""
+    posts = list(posts)
+    liked = liked_post_ids(profile.id, [post.pk for post in posts]) if posts else ()
+    for post in posts:
+        post.liked_by_user = post.pk in liked
+    return posts
+
+
+def set_followed_by_me(profiles, profile):
+    """Set followed_by_me on each profile with one lookup for the whole page"""
+    profiles = list(profiles)
+    followed = (
+        followed_profile_ids(profile.id, [listed.pk for listed in profiles])
+        if profiles
+        else ()
+    )
+    for listed in profiles:
+        listed.followed_by_me = listed.pk in followed
+    return profiles
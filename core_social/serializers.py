@@ -1,11 +1,24 @@
-from drf_spectacular.types import OpenApiTypes
-from drf_spectacular.utils import extend_schema_field
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
 
-from .models import Profile, FollowingRelationships, Post, Comment
-
-
-class ProfileSerializer(serializers.ModelSerializer):
+from social_media_api.openapi import OpenApiTypes, extend_schema_field
+from social_media_api.instrumentation import TimedSerializerMixin
+from .fieldsets import SparseFieldsetMixin
+from .models import (
+    Profile,
+    FollowingRelationships,
+    Post,
+    Comment,
+    Like,
+    Notification,
+    Hashtag,
+    normalize_username,
+)
+
+
+class ProfileSerializer(
+    SparseFieldsetMixin, TimedSerializerMixin, serializers.ModelSerializer
+):
     """Serializer for Profile model with update method for profile image"""
 
     user_email = serializers.EmailField(source="user.email", read_only=True)
@@ -28,11 +41,29 @@ class ProfileSerializer(serializers.ModelSerializer):
             "following_count",
         )
 
+    def validate_username(self, value):
+        """Usernames are unique regardless of case"""
+        others = Profile.objects.filter(username_normalized=normalize_username(value))
+        if self.instance is not None:
+            others = others.exclude(pk=self.instance.pk)
+        if normalize_username(value) and others.exists():
+            raise serializers.ValidationError("This username is already taken.")
+        return value
+
     def update(self, instance, validated_data):
-        """If image is not included in request, don't update the image field"""
+        """
+        If image is not included in request, don't update the image field.
+        A username taken concurrently since it was validated is rejected.
+        """
         if "profile_image" not in validated_data or not validated_data["profile_image"]:
             validated_data["profile_image"] = instance.profile_image
-        return super().update(instance, validated_data)
+        try:
+            with transaction.atomic():
+                return super().update(instance, validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError(
+                {"username": ["This username is already taken."]}
+            )
 
 
 class ProfileListSerializer(ProfileSerializer):
@@ -48,7 +79,24 @@ class ProfileListSerializer(ProfileSerializer):
         return obj.full_name
 
 
-class FollowingRelationshipSerializer(serializers.ModelSerializer):
+class ProfileReferenceSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    profile_id = serializers.IntegerField(source="id", read_only=True)
+
+    class Meta:
+        model = Profile
+        fields = ("profile_id", "username")
+
+
+class ProfileSuggestionSerializer(ProfileListSerializer):
+    score = serializers.IntegerField(read_only=True)
+
+    class Meta(ProfileListSerializer.Meta):
+        fields = ProfileListSerializer.Meta.fields + ("score",)
+
+
+class FollowingRelationshipSerializer(
+    TimedSerializerMixin, serializers.ModelSerializer
+):
     profile_id = serializers.IntegerField(source="following.id", read_only=True)
     username = serializers.CharField(source="following.username")
 
@@ -57,7 +105,7 @@ class FollowingRelationshipSerializer(serializers.ModelSerializer):
         fields = ("profile_id", "username")
 
 
-class FollowerRelationshipSerializer(serializers.ModelSerializer):
+class FollowerRelationshipSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     profile_id = serializers.IntegerField(source="follower.id", read_only=True)
     username = serializers.CharField(source="follower.username")
 
@@ -67,8 +115,14 @@ class FollowerRelationshipSerializer(serializers.ModelSerializer):
 
 
 class ProfileDetailSerializer(ProfileSerializer):
-    followers = FollowerRelationshipSerializer(many=True, read_only=True)
-    following = FollowingRelationshipSerializer(many=True, read_only=True)
+    embedded_fields = ("followers", "following")
+
+    followers = FollowerRelationshipSerializer(
+        source="recent_followers", many=True, read_only=True
+    )
+    following = FollowingRelationshipSerializer(
+        source="recent_following", many=True, read_only=True
+    )
 
     class Meta:
         model = Profile
@@ -87,7 +141,7 @@ class ProfileDetailSerializer(ProfileSerializer):
         )
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     post_id = serializers.IntegerField(source="post.id", read_only=True)
     author_username = serializers.CharField(source="author.username", read_only=True)
     commented_at = serializers.DateTimeField(read_only=True)
@@ -97,21 +151,23 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = ("id", "author_username", "post_id", "content", "commented_at")
 
 
-class LikeSerializer(serializers.ModelSerializer):
+class LikeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     liked_by = serializers.CharField(source="profile.username", read_only=True)
 
     class Meta:
-        model = Post
+        model = Like
         fields = ("id", "liked_by")
 
 
-class PostImageSerializer(serializers.ModelSerializer):
+class PostImageSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Post
         fields = ("id", "image")
 
 
-class PostSerializer(serializers.ModelSerializer):
+class PostSerializer(
+    SparseFieldsetMixin, TimedSerializerMixin, serializers.ModelSerializer
+):
     author_username = serializers.CharField(source="author.username", read_only=True)
     author_full_name = serializers.CharField(source="author.full_name", read_only=True)
     author_image = serializers.ImageField(source="author.profile_image", read_only=True)
@@ -143,10 +199,22 @@ class PostListSerializer(PostSerializer):
         fields = PostSerializer.Meta.fields + ("liked_by_user",)
 
 
+class PostCountsSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    likes_count = serializers.IntegerField(read_only=True)
+    comments_count = serializers.IntegerField(read_only=True)
+    liked_by_user = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = Post
+        fields = ("id", "likes_count", "comments_count", "liked_by_user")
+
+
 class PostDetailSerializer(PostSerializer):
+    embedded_fields = ("comments", "likes")
+
     liked_by_user = serializers.BooleanField(read_only=True)
-    comments = CommentSerializer(many=True, read_only=True)
-    likes = LikeSerializer(many=True, read_only=True)
+    comments = CommentSerializer(source="recent_comments", many=True, read_only=True)
+    likes = LikeSerializer(source="recent_likes", many=True, read_only=True)
 
     class Meta(PostSerializer.Meta):
         fields = PostSerializer.Meta.fields + (
@@ -154,3 +222,50 @@ class PostDetailSerializer(PostSerializer):
             "comments",
             "likes",
         )
+
+
+class NotificationSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    latest_actor = ProfileReferenceSerializer(read_only=True)
+    message = serializers.SerializerMethodField()
+    is_read = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Notification
+        fields = (
+            "id",
+            "verb",
+            "post",
+            "latest_actor",
+            "actor_count",
+            "message",
+            "is_read",
+            "updated_at",
+        )
+
+    MESSAGES = {
+        Notification.LIKE: "liked your post",
+        Notification.COMMENT: "commented on your post",
+        Notification.FOLLOW: "followed you",
+    }
+
+    def get_message(self, obj) -> str:
+        actor = obj.latest_actor.username if obj.latest_actor else "Someone"
+        others = obj.actor_count - 1
+        if others == 1:
+            actor = f"{actor} and 1 other"
+        elif others > 1:
+            actor = f"{actor} and {others} others"
+        return f"{actor} {self.MESSAGES[obj.verb]}"
+
+    def get_is_read(self, obj) -> bool:
+        return obj.read_at is not None
+
+
+class UnreadCountSerializer(serializers.Serializer):
+    unread = serializers.IntegerField()
+
+
+class HashtagSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Hashtag
+        fields = ("name", "post_count")
@@ -1,6 +1,7 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
+from . import versioning
 from .models import Profile
 
 User = get_user_model()
@@ -15,3 +16,9 @@ def create_user_profile(sender, instance, created, **kwargs):
 @receiver(post_save, sender=User)
 def save_user_profile(sender, instance, **kwargs):
     instance.profile.save()
+
+
+@receiver(post_save, sender=Profile)
+def profile_created(sender, instance, created, **kwargs):
+    if created:
+        versioning.profile_created(instance.id)
@@ -0,0 +1,79 @@
+import heapq
+from collections import Counter, defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+
+from core_social.models import FollowingRelationships, Profile, ProfileSuggestion
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _following_of(profile_ids, batch_size):
+    """Map each of the profiles to the set of ids of the profiles it follows"""
+    following = defaultdict(set)
+    for chunk in _chunks(profile_ids, batch_size):
+        rows = (
+            FollowingRelationships.objects.filter(follower_id__in=chunk)
+            .order_by()
+            .values_list("follower_id", "following_id")
+        )
+        for follower_id, following_id in rows.iterator():
+            following[follower_id].add(following_id)
+    return following
+
+
+def compute_suggestions(profile_ids, top_k, batch_size):
+    """
+    Friends-of-friends candidates of each profile scored by how many of
+    the profiles it follows follow the candidate, best top_k first.
+    """
+    first_hop = _following_of(profile_ids, batch_size)
+    second_hop = _following_of(set().union(*first_hop.values()), batch_size)
+
+    suggestions = {}
+    for profile_id in profile_ids:
+        followed = first_hop.get(profile_id, set())
+        scores = Counter()
+        for followed_id in followed:
+            scores.update(second_hop.get(followed_id, ()))
+        for excluded_id in followed | {profile_id}:
+            scores.pop(excluded_id, None)
+        suggestions[profile_id] = heapq.nsmallest(
+            top_k, scores.items(), key=lambda item: (-item[1], item[0])
+        )
+    return suggestions
+
+
+def store_suggestions(suggestions):
+    """Replace the stored suggestions of the given profiles"""
+    with transaction.atomic():
+        ProfileSuggestion.objects.filter(profile_id__in=list(suggestions)).delete()
+        ProfileSuggestion.objects.bulk_create(
+            ProfileSuggestion(
+                profile_id=profile_id,
+                suggested_id=suggested_id,
+                score=score,
+                rank=rank,
+            )
+            for profile_id, candidates in suggestions.items()
+            for rank, (suggested_id, score) in enumerate(candidates, start=1)
+        )
+
+
+def refresh_suggestions():
+    """Recompute the suggestions of all profiles batch by batch"""
+    config = settings.FOLLOW_SUGGESTIONS
+    profile_ids = Profile.objects.order_by("pk").values_list("pk", flat=True)
+    refreshed = 0
+    for batch in _chunks(profile_ids.iterator(), config["BATCH_SIZE"]):
+        store_suggestions(
+            compute_suggestions(batch, config["TOP_K"], config["BATCH_SIZE"])
+        )
+        refreshed += len(batch)
+    return refreshed
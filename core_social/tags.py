@@ -0,0 +1,153 @@
+import re
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import F
+
+from core_social.models import (
+    Hashtag,
+    Post,
+    PostHashtag,
+    PostMention,
+    Profile,
+    normalize_username,
+)
+
+# Tags and usernames longer than their columns are skipped, not truncated
+HASHTAG_PATTERN = re.compile(r"(?<![\w#])#(\w{1,100})(?!\w)")
+MENTION_PATTERN = re.compile(r"(?<![\w@])@(\w{1,50})(?!\w)")
+
+
+def normalize_tag(tag):
+    """Lowercase tag name posts are looked up by, without a leading #"""
+    return tag.strip().lstrip("#").lower()
+
+
+def extract(content):
+    """The hashtag names and the normalized usernames mentioned in content"""
+    hashtags = {normalize_tag(name) for name in HASHTAG_PATTERN.findall(content)}
+    usernames = {
+        normalize_username(username) for username in MENTION_PATTERN.findall(content)
+    }
+    return hashtags, usernames
+
+
+def _count_posts(deltas):
+    """
+    Add the deltas to the hashtags' post counts. The hashtags are locked in
+    id order first, so concurrent updates of shared tags do not deadlock.
+    """
+    deltas = {hashtag_id: delta for hashtag_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    list(
+        Hashtag.objects.select_for_update()
+        .filter(id__in=deltas)
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+    ids_by_delta = defaultdict(list)
+    for hashtag_id, delta in deltas.items():
+        ids_by_delta[delta].append(hashtag_id)
+    for delta, hashtag_ids in ids_by_delta.items():
+        Hashtag.objects.filter(id__in=hashtag_ids).update(
+            post_count=F("post_count") + delta
+        )
+
+
+def _sync(model, field, post_ids, wanted):
+    """
+    Make the (post_id, <field>) rows of the posts the wanted pairs. Returns
+    the pairs added and removed.
+    """
+    current = set(
+        model.objects.filter(post_id__in=post_ids).values_list("post_id", field)
+    )
+    added, removed = wanted - current, current - wanted
+    post_ids_by_value = defaultdict(list)
+    for post_id, value in removed:
+        post_ids_by_value[value].append(post_id)
+    for value, removed_post_ids in post_ids_by_value.items():
+        model.objects.filter(post_id__in=removed_post_ids, **{field: value}).delete()
+    model.objects.bulk_create(
+        [model(post_id=post_id, **{field: value}) for post_id, value in added],
+        ignore_conflicts=True,
+    )
+    return added, removed
+
+
+def index_posts(posts):
+    """
+    Replace the hashtags and mentions of the posts with the ones in their
+    content. Posts are locked while indexed, so concurrent edits of a post
+    count its hashtags once.
+    """
+    parsed = {post.id: extract(post.content) for post in posts}
+    if not parsed:
+        return
+    names = set().union(*(hashtags for hashtags, _ in parsed.values()))
+    usernames = set().union(*(usernames for _, usernames in parsed.values()))
+
+    with transaction.atomic():
+        list(
+            Post.objects.select_for_update()
+            .filter(id__in=parsed)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        Hashtag.objects.bulk_create(
+            [Hashtag(name=name) for name in names], ignore_conflicts=True
+        )
+        hashtag_ids = dict(
+            Hashtag.objects.filter(name__in=names).values_list("name", "id")
+        )
+        profile_ids = dict(
+            Profile.objects.filter(username_normalized__in=usernames).values_list(
+                "username_normalized", "id"
+            )
+        )
+
+        added, removed = _sync(
+            PostHashtag,
+            "hashtag_id",
+            list(parsed),
+            {
+                (post_id, hashtag_ids[name])
+                for post_id, (hashtags, _) in parsed.items()
+                for name in hashtags
+            },
+        )
+        deltas = Counter(hashtag_id for _, hashtag_id in added)
+        deltas.subtract(hashtag_id for _, hashtag_id in removed)
+        _count_posts(deltas)
+
+        _sync(
+            PostMention,
+            "profile_id",
+            list(parsed),
+            {
+                (post_id, profile_ids[username])
+                for post_id, (_, usernames) in parsed.items()
+                for username in usernames
+                if username in profile_ids
+            },
+        )
+
+
+def hashtags_removed(hashtag_ids):
+    """Uncount a post from each hashtag in hashtag_ids, once per occurrence"""
+    _count_posts(
+        {hashtag_id: -count for hashtag_id, count in Counter(hashtag_ids).items()}
+    )
+
+
+def unindex_post(post):
+    """Uncount the hashtags of a post about to be deleted"""
+    with transaction.atomic():
+        hashtag_ids = list(
+            PostHashtag.objects.filter(post_id=post.id).values_list(
+                "hashtag_id", flat=True
+            )
+        )
+        PostHashtag.objects.filter(post_id=post.id).delete()
+        hashtags_removed(hashtag_ids)
@@ -1,9 +1,118 @@
+import logging
+
 from celery import shared_task
-from core_social.models import Post
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+
+from core_social import account_deletion, changelog, notifications, outbox
+from core_social import tags, versioning
+from core_social.models import (
+    AccountDeletion,
+    ChangeLogEntry,
+    OutboxMessage,
+    Post,
+    Profile,
+)
+from core_social.suggestions import refresh_suggestions
+from core_social.trending import refresh_scores
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def relay_outbox():
+    """Send the due outbox messages to the tasks handling them."""
+    return outbox.relay()
+
+
+@shared_task
+def publish_scheduled_posts(message_ids):
+    """
+    Create the posts of due scheduled post messages. Each post is created
+    in its own savepoint, messages whose author is gone or deactivated are
+    dropped without holding back the rest of the batch.
+    """
+    with outbox.claim(OutboxMessage.SCHEDULED_POST, message_ids) as messages:
+        active_authors = set(
+            Profile.objects.active()
+            .filter(id__in={message.payload["author_id"] for message in messages})
+            .values_list("id", flat=True)
+        )
+        posts = []
+        for message in messages:
+            if message.payload["author_id"] not in active_authors:
+                continue
+            try:
+                with transaction.atomic():
+                    posts.append(Post.objects.create(**message.payload))
+            except IntegrityError:
+                logger.warning(
+                    "Dropped scheduled post message %s", message.id, exc_info=True
+                )
+        tags.index_posts(posts)
+        for post in posts:
+            versioning.post_changed(post.id, post.author_id)
+            changelog.record(ChangeLogEntry.POST_CREATED, post.author_id, post.id)
+
+
+@shared_task
+def refresh_follow_suggestions():
+    """Recompute the "who to follow" suggestions of all profiles."""
+    return refresh_suggestions()
+
+
+@shared_task
+def refresh_trending_scores():
+    """Fold recent likes and comments into the trending post scores."""
+    refresh_scores()
+
+
+@shared_task
+def prune_feed_changes():
+    """Delete the feed change log entries past their retention."""
+    return changelog.prune()
+
+
+@shared_task
+def purge_accounts(message_ids):
+    """
+    Delete a batch of each account's rows, queueing a message to continue
+    until done. A message is completed after its purge, so an interrupted
+    purge is relayed again and picks up where it stopped. An account held
+    by another purge, one of a redelivered message, is skipped.
+    """
+    for message in outbox.pending(OutboxMessage.ACCOUNT_DELETION, message_ids):
+        deletion = AccountDeletion.objects.filter(
+            pk=message.payload["deletion_id"]
+        ).first()
+        if deletion is not None and not account_deletion.acquire(deletion):
+            continue
+        try:
+            finished, files = (
+                account_deletion.purge(deletion) if deletion else (True, [])
+            )
+            with transaction.atomic():
+                outbox.complete([message])
+                if files:
+                    outbox.enqueue(OutboxMessage.MEDIA_DELETION, {"names": files})
+                if not finished:
+                    account_deletion.continue_deletion(deletion)
+        finally:
+            if deletion is not None:
+                account_deletion.release(deletion)
+
+
+@shared_task
+def delete_media_files(message_ids):
+    """Delete uploaded files whose rows were deleted."""
+    with outbox.claim(OutboxMessage.MEDIA_DELETION, message_ids) as messages:
+        for message in messages:
+            for name in message.payload["names"]:
+                default_storage.delete(name)
 
 
 @shared_task
-def create_scheduled_post(post_data):
-    """Create a post with the given data."""
-    post_data.pop("scheduled_at", None)
-    Post.objects.create(**post_data)
+def deliver_notifications(message_ids):
+    """Coalesce queued likes, comments and follows into notifications."""
+    with outbox.claim(OutboxMessage.NOTIFICATION, message_ids) as messages:
+        return notifications.deliver([message.payload for message in messages])
@@ -1,3 +1,425 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.test import AsyncClient, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core_social import account_deletion, notifications, tags, tasks
+from core_social.models import (
+    Notification,
+    OutboxMessage,
+    Post,
+    Profile,
+    normalize_username,
+)
+from core_social.relationships import liked_posts_cache
+from core_social.serializers import ProfileSerializer
+
+
+def create_user(email, username=""):
+    user = get_user_model().objects.create_user(email=email, password="password123")
+    if username:
+        user.profile.username = username
+        user.profile.save()
+    return user
+
+
+def client_for(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+class ProfileListTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_user("viewer@example.com")
+        self.client = client_for(self.user)
+
+    @override_settings(SHARED_CACHE=True)
+    def test_registration_changes_profile_list_etag(self):
+        response = self.client.get(reverse("core_social:profiles-list"))
+        etag = response["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = APIClient().post(
+                reverse("user:create"),
+                {"email": "new@example.com", "password": "password123"},
+            )
+        self.assertEqual(response.status_code, 201)
+        response = self.client.get(
+            reverse("core_social:profiles-list"), HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 2)
+
+    @override_settings(SHARED_CACHE=True)
+    def test_email_change_changes_own_profile_etag(self):
+        response = self.client.get(reverse("core_social:me"))
+        etag = response["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                reverse("user:manage"), {"email": "renamed@example.com"}
+            )
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(reverse("core_social:me"), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["user_email"], "renamed@example.com")
+
+    @override_settings(SHARED_CACHE=True)
+    def test_follower_rename_changes_profile_detail_etag(self):
+        follower = create_user("follower@example.com", username="follower")
+        url = reverse("core_social:profiles-detail", args=[self.user.profile.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client_for(follower).post(
+                reverse("core_social:profiles-follow", args=[self.user.profile.id])
+            )
+        self.assertIn(response.status_code, (200, 201, 204))
+        etag = self.client.get(url)["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client_for(follower).patch(
+                reverse("core_social:me"), {"username": "renamed"}
+            )
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(SHARED_CACHE=False)
+    def test_no_etag_without_shared_cache(self):
+        response = self.client.get(reverse("core_social:profiles-list"))
+
+        self.assertNotIn("ETag", response)
+
+    def test_pages_past_duplicate_sort_keys(self):
+        users = get_user_model().objects.bulk_create(
+            get_user_model()(email=f"user{index}@example.com", password="!")
+            for index in range(1300)
+        )
+        Profile.objects.bulk_create(Profile(user=user, sort_key="") for user in users)
+
+        seen = []
+        url = reverse("core_social:profiles-list") + "?page_size=200&fields=id"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(profile["id"] for profile in response.data["results"])
+            url = response.data["next"]
+
+        self.assertEqual(len(seen), 1301)
+        self.assertEqual(len(set(seen)), 1301)
+
+    async def test_async_list_pages_like_sync_list(self):
+        for index in range(5):
+            await sync_to_async(create_user)(f"user{index}@example.com")
+        headers = {"authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+
+        pages = []
+        url = reverse("core_social:async-profiles-list") + "?page_size=2&fields=id"
+        while url:
+            response = await AsyncClient().get(url, headers=headers)
+            self.assertEqual(response.status_code, 200)
+            pages.append([profile["id"] for profile in response.json()["results"]])
+            url = response.json()["next"]
+
+        expected = [
+            [profile["id"] for profile in page.data["results"]]
+            for page in await sync_to_async(self.sync_pages)()
+        ]
+        self.assertEqual(pages, expected)
+        self.assertEqual(len(pages), 3)
+
+    def sync_pages(self):
+        pages = []
+        url = reverse("core_social:profiles-list") + "?page_size=2&fields=id"
+        while url:
+            pages.append(self.client.get(url))
+            url = pages[-1].data["next"]
+        return pages
+
+    async def test_async_list_rejects_invalid_cursor(self):
+        headers = {"authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+
+        response = await AsyncClient().get(
+            reverse("core_social:async-profiles-list") + "?cursor=invalid",
+            headers=headers,
+        )
+
+        self.assertEqual(response.status_code, 404)
+
+
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_user("viewer@example.com")
+
+    def test_unknown_field_is_rejected(self):
+        response = client_for(self.user).get(
+            reverse("core_social:posts-list") + "?fields=id,like_count"
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["fields"], ["Unknown fields: like_count."])
+
+    def test_unknown_embedded_list_is_rejected(self):
+        response = client_for(self.user).get(
+            reverse("core_social:profiles-detail", args=[self.user.profile.id])
+            + "?include=follower"
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("include", response.data)
+
+    async def test_async_view_rejects_unknown_field(self):
+        response = await AsyncClient().get(
+            reverse("core_social:async-posts-list") + "?fields=id,like_count",
+            headers={"authorization": f"Bearer {AccessToken.for_user(self.user)}"},
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["fields"], ["Unknown fields: like_count."])
+
+
+class ProfileUsernameTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        create_user("first@example.com", username="Bob")
+        self.user = create_user("second@example.com")
+        # Left unset by the backfill as a case-duplicate of another username
+        Profile.objects.filter(user=self.user).update(
+            username="bob", username_normalized=None
+        )
+
+    def test_profile_with_unset_username_is_saved(self):
+        response = client_for(self.user).patch(
+            reverse("core_social:me"), {"bio": "hello"}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        profile = Profile.objects.get(user=self.user)
+        self.assertEqual(profile.bio, "hello")
+        self.assertIsNone(profile.username_normalized)
+
+    def test_user_with_unset_username_is_saved(self):
+        self.user.is_active = False
+        self.user.save(update_fields=["is_active"])
+
+        self.assertFalse(get_user_model().objects.get(pk=self.user.pk).is_active)
+
+    def test_username_claimed_concurrently_is_rejected(self):
+        # The other claim commits between validation and the update
+        with mock.patch.object(
+            ProfileSerializer, "validate_username", lambda self, value: value
+        ):
+            response = client_for(self.user).patch(
+                reverse("core_social:me"), {"username": "BOB"}
+            )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("username", response.data)
+
+    def test_changed_username_is_normalized(self):
+        profile = Profile.objects.get(user=self.user)
+        profile.username = "Robert"
+        profile.save()
+
+        profile.refresh_from_db()
+        self.assertEqual(profile.username_normalized, normalize_username("Robert"))
+
+
+class NotificationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = create_user("author@example.com")
+        self.post = Post.objects.create(author=self.author.profile, content="hello")
+
+    def like(self, email):
+        response = client_for(create_user(email)).post(
+            reverse("core_social:posts-like", args=[self.post.id])
+        )
+        self.assertEqual(response.status_code, 204)
+
+    def deliver(self):
+        tasks.deliver_notifications(
+            list(
+                OutboxMessage.objects.filter(
+                    topic=OutboxMessage.NOTIFICATION
+                ).values_list("id", flat=True)
+            )
+        )
+
+    def unread(self):
+        return Notification.objects.filter(
+            recipient=self.author.profile, read_at__isnull=True
+        )
+
+    def test_likes_coalesce_across_deliveries(self):
+        self.like("first@example.com")
+        self.like("second@example.com")
+        self.deliver()
+        self.like("third@example.com")
+        self.deliver()
+
+        notification = self.unread().get()
+        self.assertEqual(notification.actor_count, 3)
+        self.assertEqual(len(notification.recent_actor_ids), 3)
+
+    def test_likes_after_read_start_new_notification(self):
+        self.like("first@example.com")
+        self.deliver()
+        self.unread().update(read_at=self.post.created_at)
+        self.like("second@example.com")
+        self.deliver()
+
+        self.assertEqual(Notification.objects.count(), 2)
+        self.assertEqual(self.unread().get().actor_count, 1)
+
+    def test_notification_read_during_delivery_is_started_over(self):
+        self.like("first@example.com")
+        self.deliver()
+        self.like("second@example.com")
+        insert = Notification.objects.bulk_create
+
+        def insert_then_mark_read(rows, **kwargs):
+            created = insert(rows, **kwargs)
+            if kwargs.get("ignore_conflicts"):
+                notifications.mark_read(self.author.profile.id)
+            return created
+
+        with mock.patch.object(
+            Notification.objects, "bulk_create", insert_then_mark_read
+        ):
+            self.deliver()
+
+        self.assertEqual(Notification.objects.count(), 2)
+        self.assertEqual(self.unread().get().actor_count, 1)
+
+    def test_one_unread_notification_per_post_and_verb(self):
+        self.like("first@example.com")
+        self.deliver()
+        notification = self.unread().get()
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Notification.objects.create(
+                recipient=notification.recipient,
+                verb=notification.verb,
+                post=notification.post,
+                latest_actor=notification.latest_actor,
+            )
+
+
+class TagExtractionTests(SimpleTestCase):
+    def test_overlong_hashtags_and_mentions_are_skipped(self):
+        hashtags, usernames = tags.extract(
+            f"#{'a' * 101} #{'b' * 100} @{'c' * 51} @{'d' * 50}"
+        )
+
+        self.assertEqual(hashtags, {"b" * 100})
+        self.assertEqual(usernames, {normalize_username("d" * 50)})
+
+
+class LikedPostsCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        author = create_user("author@example.com")
+        self.post = Post.objects.create(author=author.profile, content="hello")
+
+    @override_settings(
+        VIEWER_RELATIONSHIP_CACHE={"MAX_VIEWERS": 10, "MAX_IDS": 10, "TTL": 30}
+    )
+    def test_liked_posts_cache_follows_committed_likes(self):
+        user = create_user("first@example.com")
+        client = client_for(user)
+        liked = liked_posts_cache.get(user.profile.id)
+        like_url = reverse("core_social:posts-like", args=[self.post.id])
+        unlike_url = reverse("core_social:posts-unlike", args=[self.post.id])
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            client.post(like_url)
+        self.assertNotIn(self.post.id, liked)
+        for callback in callbacks:
+            callback()
+        self.assertIn(self.post.id, liked)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            client.post(unlike_url)
+        self.assertIn(self.post.id, liked)
+        for callback in callbacks:
+            callback()
+        self.assertNotIn(self.post.id, liked)
+
+
+class ScheduledPostTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = create_user("author@example.com")
+
+    def schedule(self, author_id, content):
+        return OutboxMessage.objects.create(
+            topic=OutboxMessage.SCHEDULED_POST,
+            payload={"author_id": author_id, "content": content},
+        )
+
+    def test_undeliverable_messages_do_not_hold_back_batch(self):
+        gone = create_user("gone@example.com")
+        inactive = create_user("inactive@example.com")
+        messages = [
+            self.schedule(gone.profile.id, "gone"),
+            self.schedule(inactive.profile.id, "inactive"),
+            self.schedule(self.author.profile.id, "published"),
+        ]
+        gone.delete()
+        inactive.is_active = False
+        inactive.save(update_fields=["is_active"])
+
+        tasks.publish_scheduled_posts([message.id for message in messages])
+
+        self.assertEqual(
+            list(Post.objects.values_list("content", flat=True)), ["published"]
+        )
+        self.assertFalse(OutboxMessage.objects.exists())
+
+
+class AccountDeletionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_user("leaving@example.com")
+        self.profile = self.user.profile
+
+    def schedule(self):
+        return OutboxMessage.objects.create(
+            topic=OutboxMessage.SCHEDULED_POST,
+            payload={"author_id": self.profile.id, "content": "later"},
+        )
+
+    def test_deletion_request_cancels_scheduled_posts(self):
+        self.schedule()
+
+        response = client_for(self.user).delete(reverse("core_social:me"))
+
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(
+            OutboxMessage.objects.filter(topic=OutboxMessage.SCHEDULED_POST).exists()
+        )
+
+    def test_purge_deletes_scheduled_posts(self):
+        deletion = account_deletion.request_deletion(self.profile)
+        self.schedule()
+
+        finished, _ = account_deletion.purge(deletion, max_batches=100)
+
+        self.assertTrue(finished)
+        self.assertEqual(deletion.progress["scheduled_posts"], 1)
+        self.assertFalse(
+            OutboxMessage.objects.filter(topic=OutboxMessage.SCHEDULED_POST).exists()
+        )
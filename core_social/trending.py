@@ -0,0 +1,117 @@
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from core_social.models import Comment, Like, PostTrendingScore, TrendingRefresh
+
+# Scores are measured against this instant, an engagement at time t adds
+# exp(decay * (t - EPOCH)) to the sum whose log is stored
+EPOCH = datetime(2023, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def _decay_rate():
+    """Decay per second for the configured half-life"""
+    return math.log(2) / (settings.TRENDING_POSTS["HALF_LIFE_HOURS"] * 3600)
+
+
+def logaddexp(a, b):
+    """log(exp(a) + exp(b)) without overflowing"""
+    high, low = max(a, b), min(a, b)
+    return high + math.log1p(math.exp(low - high))
+
+
+def log_score(weight, engaged_at):
+    return math.log(weight) + _decay_rate() * (engaged_at - EPOCH).total_seconds()
+
+
+def engagement_scores(since, until):
+    """
+    Log scores of the likes and comments made in (since, until] by post.
+    Sources without a positive weight are not counted.
+    """
+    config = settings.TRENDING_POSTS
+    sources = (
+        (Like.objects, "liked_at", config["LIKE_WEIGHT"]),
+        (Comment.objects, "commented_at", config["COMMENT_WEIGHT"]),
+    )
+    scores = defaultdict(lambda: -math.inf)
+    for manager, field, weight in sources:
+        if weight <= 0:
+            continue
+        rows = (
+            manager.filter(**{f"{field}__gt": since, f"{field}__lte": until})
+            .order_by()
+            .values_list("post_id", field)
+        )
+        for post_id, engaged_at in rows.iterator():
+            scores[post_id] = logaddexp(scores[post_id], log_score(weight, engaged_at))
+    return scores
+
+
+def _prune(now):
+    """Drop posts whose score is below a single like at the window start"""
+    window_start = now - timedelta(hours=settings.TRENDING_POSTS["WINDOW_HOURS"])
+    PostTrendingScore.objects.filter(score__lt=log_score(1, window_start)).delete()
+
+
+def rebuild(until, now):
+    """Recompute the scores from the engagements within the window"""
+    since = until - timedelta(hours=settings.TRENDING_POSTS["WINDOW_HOURS"])
+    scores = engagement_scores(since, until)
+    with transaction.atomic():
+        PostTrendingScore.objects.all().delete()
+        PostTrendingScore.objects.bulk_create(
+            PostTrendingScore(post_id=post_id, score=score)
+            for post_id, score in scores.items()
+        )
+        _prune(now)
+
+
+def update(since, until, now):
+    """Fold the engagements made in (since, until] into the stored scores"""
+    scores = engagement_scores(since, until)
+    with transaction.atomic():
+        existing = PostTrendingScore.objects.select_for_update().in_bulk(list(scores))
+        changed, created = [], []
+        for post_id, score in scores.items():
+            if post_id in existing:
+                row = existing[post_id]
+                row.score = logaddexp(row.score, score)
+                changed.append(row)
+            else:
+                created.append(PostTrendingScore(post_id=post_id, score=score))
+        PostTrendingScore.objects.bulk_update(changed, ["score"])
+        PostTrendingScore.objects.bulk_create(created, ignore_conflicts=True)
+        _prune(now)
+
+
+def refresh_scores():
+    """
+    Update the scores incrementally since the watermark stored with them.
+    Engagements newer than COMMIT_LAG_SECONDS may still be joined by older
+    ones committing later, so they are left for the next run. On the first
+    run, or REBUILD_HOURS after the last rebuild, the scores are rebuilt,
+    which also drops removed likes and comments. Concurrent runs wait for
+    each other on the refresh row.
+    """
+    config = settings.TRENDING_POSTS
+    TrendingRefresh.objects.bulk_create(
+        [TrendingRefresh(pk=1, watermark=EPOCH, rebuilt_at=EPOCH)],
+        ignore_conflicts=True,
+    )
+    with transaction.atomic():
+        state = TrendingRefresh.objects.select_for_update().get(pk=1)
+        now = timezone.now()
+        settled = now - timedelta(seconds=config["COMMIT_LAG_SECONDS"])
+        if now - state.rebuilt_at >= timedelta(hours=config["REBUILD_HOURS"]):
+            rebuild(settled, now)
+            state.rebuilt_at = now
+        elif settled > state.watermark:
+            update(state.watermark, settled, now)
+        state.watermark = max(state.watermark, settled)
+        state.save(update_fields=["watermark", "rebuilt_at"])
+    return state.watermark
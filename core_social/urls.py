@@ -1,5 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+
+from core_social import async_views
 from core_social.views import (
     ProfileViewSet,
     CurrentUserProfileView,
@@ -7,12 +9,16 @@ from core_social.views import (
     ProfileFollowingView,
     PostViewSet,
     CommentViewSet,
+    NotificationViewSet,
+    HashtagViewSet,
 )
 
 router = DefaultRouter()
 router.register(r"profiles", ProfileViewSet, basename="profiles")
 router.register(r"posts", PostViewSet, basename="posts")
 router.register(r"posts/(?P<post_id>\d+)/comments", CommentViewSet, "post-comments")
+router.register(r"notifications", NotificationViewSet, basename="notifications")
+router.register(r"hashtags", HashtagViewSet, basename="hashtags")
 
 
 urlpatterns = [
@@ -20,6 +26,15 @@ urlpatterns = [
     path("me/", CurrentUserProfileView.as_view(), name="me"),
     path("me/followers/", ProfileFollowersView.as_view(), name="me_followers"),
     path("me/following/", ProfileFollowingView.as_view(), name="me_following"),
+    path("async/posts/", async_views.post_list, name="async-posts-list"),
+    path("async/posts/feed/", async_views.post_feed, name="async-posts-feed"),
+    path("async/posts/<int:pk>/", async_views.post_detail, name="async-posts-detail"),
+    path("async/profiles/", async_views.profile_list, name="async-profiles-list"),
+    path(
+        "async/profiles/<int:pk>/",
+        async_views.profile_detail,
+        name="async-profiles-detail",
+    ),
 ]
 
 app_name = "core_social"
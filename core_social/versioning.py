@@ -0,0 +1,215 @@
+import hashlib
+import uuid
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+from core_social import follow_graph
+from core_social.models import Post
+from core_social.serializers import ProfileDetailSerializer
+
+# Version stamps are random tokens replaced on every write, a missing stamp
+# is recreated so an evicted one only costs a full response. The stamps must
+# be seen by every process, so ETags are only used with SHARED_CACHE
+
+
+def _key(name, object_id=None):
+    return f"version:{name}" if object_id is None else f"version:{name}:{object_id}"
+
+
+def post_key(post_id):
+    return _key("post", post_id)
+
+
+def posts_key():
+    return _key("posts")
+
+
+def author_posts_key(profile_id):
+    return _key("author-posts", profile_id)
+
+
+def liked_by_key(profile_id):
+    return _key("liked-by", profile_id)
+
+
+def profile_key(profile_id):
+    return _key("profile", profile_id)
+
+
+def profiles_key():
+    return _key("profiles")
+
+
+def versions(keys):
+    """Return the current stamp of each key"""
+    found = cache.get_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, timeout=settings.CONDITIONAL_GET_VERSION_TIMEOUT)
+        found.update(missing)
+    return found
+
+
+def bump(*keys):
+    """Replace the stamps of the keys once the transaction commits"""
+    keys = [key for key in keys if key is not None]
+
+    def replace():
+        cache.set_many(
+            {key: uuid.uuid4().hex for key in keys},
+            timeout=settings.CONDITIONAL_GET_VERSION_TIMEOUT,
+        )
+
+    transaction.on_commit(replace)
+
+
+def post_changed(post_id, author_id):
+    bump(
+        post_key(post_id) if post_id else None,
+        posts_key(),
+        author_posts_key(author_id),
+    )
+
+
+def like_changed(post, profile_id):
+    post_changed(post.id, post.author_id)
+    bump(liked_by_key(profile_id))
+
+
+def profile_created(profile_id):
+    bump(profile_key(profile_id), profiles_key())
+
+
+def profile_changed(profile_id):
+    """Profile fields are shown on the profile and next to the profile's posts"""
+    bump(
+        profile_key(profile_id),
+        profiles_key(),
+        posts_key(),
+        author_posts_key(profile_id),
+    )
+
+
+def user_changed(profile_id):
+    """The user's email is shown on the profile"""
+    bump(profile_key(profile_id))
+
+
+def follow_changed(follower_id, following_id):
+    bump(profile_key(follower_id), profile_key(following_id))
+
+
+def make_etag(request, keys):
+    """ETag of the response to the request given the stamps it depends on"""
+    stamps = versions(keys)
+    parts = [
+        request.get_full_path(),
+        str(request.user.pk),
+        request.headers.get("Accept", ""),
+        *(stamps[key] for key in keys),
+    ]
+    return '"%s"' % hashlib.sha256("|".join(parts).encode()).hexdigest()[:32]
+
+
+def set_etag(response, etag):
+    if response.status_code == 200:
+        response["ETag"] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional_get(version_keys):
+    """
+    Answer GET requests with 304 when the If-None-Match ETag is still current.
+    version_keys(view, request, **kwargs) returns the stamp keys the response
+    depends on and is called before the view method queries anything.
+    """
+
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            if not settings.SHARED_CACHE:
+                return method(view, request, *args, **kwargs)
+            etag = make_etag(request, version_keys(view, request, **kwargs))
+            not_modified = get_conditional_response(request, etag=etag)
+            if not_modified is not None:
+                return not_modified
+            return set_etag(method(view, request, *args, **kwargs), etag)
+
+        return wrapper
+
+    return decorator
+
+
+def async_conditional_get(version_keys):
+    """
+    conditional_get for async views, version_keys is called with None for
+    the view.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if not settings.SHARED_CACHE:
+                return await view(request, *args, **kwargs)
+            keys = await sync_to_async(version_keys)(None, request, **kwargs)
+            etag = await sync_to_async(make_etag)(request, keys)
+            not_modified = get_conditional_response(request, etag=etag)
+            if not_modified is not None:
+                return not_modified
+            return set_etag(await view(request, *args, **kwargs), etag)
+
+        return wrapper
+
+    return decorator
+
+
+def post_detail_keys(view, request, pk):
+    keys = [post_key(pk), liked_by_key(request.user.profile.id)]
+    author_id = Post.objects.filter(pk=pk).values_list("author_id", flat=True).first()
+    if author_id is not None:
+        keys.append(profile_key(author_id))
+    return keys
+
+
+def post_list_keys(view, request):
+    return [posts_key(), liked_by_key(request.user.profile.id)]
+
+
+def my_posts_keys(view, request):
+    profile_id = request.user.profile.id
+    return [author_posts_key(profile_id), liked_by_key(profile_id)]
+
+
+def feed_keys(view, request):
+    profile_id = request.user.profile.id
+    following = follow_graph.following_ids(profile_id)
+    return [
+        profile_key(profile_id),
+        liked_by_key(profile_id),
+        *(author_posts_key(author_id) for author_id in following),
+    ]
+
+
+def profile_list_keys(view, request):
+    return [profiles_key(), profile_key(request.user.profile.id)]
+
+
+def profile_detail_keys(view, request, pk):
+    """
+    The listed followers and followed profiles show their usernames, any
+    profile change bumps profiles_key
+    """
+    fields = ProfileDetailSerializer.selected_fields(request)
+    if fields & set(ProfileDetailSerializer.embedded_fields):
+        return [profile_key(pk), profiles_key()]
+    return [profile_key(pk)]
+
+
+def current_profile_keys(view, request):
+    return [profile_key(request.user.profile.id)]
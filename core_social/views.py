@@ -1,9 +1,9 @@
-from django.db.models import Count, Q, OuterRef, Exists, Subquery
-from drf_spectacular.utils import extend_schema, OpenApiParameter
-from drf_spectacular.types import OpenApiTypes
-
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
 from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.generics import (
     get_object_or_404,
     RetrieveUpdateDestroyAPIView,
@@ -14,99 +14,215 @@ from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
-from core_social.models import Profile, FollowingRelationships, Post, Like, Comment
+from core_social.models import (
+    Profile,
+    FollowingRelationships,
+    Post,
+    Like,
+    Comment,
+    ProfileSuggestion,
+    ChangeLogEntry,
+    Notification,
+    OutboxMessage,
+    Hashtag,
+)
 from core_social.serializers import (
     ProfileSerializer,
     ProfileListSerializer,
     ProfileDetailSerializer,
-    FollowerRelationshipSerializer,
-    FollowingRelationshipSerializer,
+    ProfileReferenceSerializer,
+    ProfileSuggestionSerializer,
     PostListSerializer,
+    PostCountsSerializer,
     PostImageSerializer,
     PostSerializer,
     PostDetailSerializer,
     CommentSerializer,
+    LikeSerializer,
+    NotificationSerializer,
+    UnreadCountSerializer,
+    HashtagSerializer,
+)
+from core_social import account_deletion, changelog, follow_graph, notifications
+from core_social import outbox, tags
+from core_social.filters import filter_posts, filter_profiles, filter_username_prefix
+from core_social.pagination import (
+    CommentCursorPagination,
+    LikeCursorPagination,
+    NotificationCursorPagination,
+    PROFILE_ORDERINGS,
+    ProfileCursorPagination,
+    profile_ordering,
 )
 from core_social.permissions import IsAuthorOrReadOnly
-from core_social.tasks import create_scheduled_post
+from core_social.relationships import (
+    liked_posts_cache,
+    set_followed_by_me,
+    set_liked_by_user,
+)
+from social_media_api.renderers import StreamingJSONListResponse
+from social_media_api.openapi import (
+    OpenApiParameter,
+    OpenApiTypes,
+    extend_schema,
+    extend_schema_view,
+)
+from core_social import versioning
+from core_social.versioning import conditional_get
+
+AUTHOR_FIELDS = {"author_username", "author_full_name", "author_image"}
+
+SPARSE_FIELDSET_PARAMETERS = [
+    OpenApiParameter(
+        "fields",
+        type=OpenApiTypes.STR,
+        description="Comma-separated fields to return example: ?fields=id,username",
+    ),
+    OpenApiParameter(
+        "include",
+        type=OpenApiTypes.STR,
+        description="Comma-separated lists to embed, all by default "
+        "example: ?include=comments",
+    ),
+]
+
+
+STREAM_PARAMETER = OpenApiParameter(
+    "stream",
+    type=OpenApiTypes.BOOL,
+    description="Write the list in chunks as it is read example: ?stream=true",
+)
+
+
+class StreamingListMixin:
+    """
+    Unpaginated list actions answer ?stream=true by reading rows from a
+    server-side cursor and serializing them a chunk at a time.
+    """
+
+    def list_response(self, queryset):
+        if self.request.query_params.get("stream") not in ("1", "true"):
+            serializer = self.get_serializer(self.set_viewer_flags(queryset), many=True)
+            return Response(serializer.data)
 
+        # Resolve the database now, the replica routing of the request has
+        # ended by the time the response body is consumed
+        queryset = queryset.using(queryset.db)
+        chunk_size = settings.STREAMING_CHUNK_SIZE
 
+        def serialize_chunk(rows):
+            return self.get_serializer(self.set_viewer_flags(rows), many=True).data
+
+        return StreamingJSONListResponse(
+            queryset.iterator(chunk_size=chunk_size), serialize_chunk, chunk_size
+        )
+
+
+def profile_queryset(fields):
+    """Profiles with only the joins and annotations the given fields need"""
+    queryset = Profile.objects.active()
+    if "user_email" in fields:
+        queryset = queryset.select_related("user")
+    if "followers_count" in fields:
+        queryset = queryset.with_followers_count()
+    if "following_count" in fields:
+        queryset = queryset.with_following_count()
+    if "followers" in fields:
+        queryset = queryset.with_recent_followers()
+    if "following" in fields:
+        queryset = queryset.with_recent_following()
+    return queryset
+
+
+def post_queryset(fields):
+    """Posts with only the joins, annotations and prefetches the fields need"""
+    queryset = Post.objects.active()
+    if fields & AUTHOR_FIELDS:
+        queryset = queryset.select_related("author")
+    if "likes_count" in fields:
+        queryset = queryset.with_likes_count()
+    if "comments_count" in fields:
+        queryset = queryset.with_comments_count()
+    if "likes" in fields:
+        queryset = queryset.with_recent_likes()
+    if "comments" in fields:
+        queryset = queryset.with_recent_comments()
+    return queryset
+
+
+@extend_schema_view(get=extend_schema(parameters=SPARSE_FIELDSET_PARAMETERS))
 class CurrentUserProfileView(RetrieveUpdateDestroyAPIView):
     serializer_class = ProfileSerializer
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return (
-            Profile.objects.filter(user=self.request.user)
-            .select_related("user")
-            .prefetch_related("following", "followers")
-            .annotate(
-                followers_count=Count("followers"), following_count=Count("following")
-            )
-        )
+        fields = self.get_serializer_class().selected_fields(self.request)
+        return profile_queryset(fields).filter(user=self.request.user)
 
     def get_object(self):
         return get_object_or_404(self.get_queryset())
 
-    def destroy(self, request, *args, **kwargs):
-        profile = self.get_object()
-        user = profile.user
-        response = super().destroy(request, *args, **kwargs)
-        user.delete()
-        return response
+    @conditional_get(versioning.current_profile_keys)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
+    def perform_update(self, serializer):
+        profile = serializer.save()
+        versioning.profile_changed(profile.id)
 
-class ProfileViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, GenericViewSet):
+    @extend_schema(responses={status.HTTP_202_ACCEPTED: None})
+    def destroy(self, request, *args, **kwargs):
+        """
+        Deactivate the account at once and delete its data in the background.
+        """
+        with transaction.atomic():
+            account_deletion.request_deletion(self.get_object())
+        return Response(status=status.HTTP_202_ACCEPTED)
+
+
+@extend_schema_view(retrieve=extend_schema(parameters=SPARSE_FIELDSET_PARAMETERS))
+class ProfileViewSet(
+    StreamingListMixin,
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    GenericViewSet,
+):
     serializer_class = ProfileListSerializer
+    pagination_class = ProfileCursorPagination
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
+    throttle_scope = None
+    throttle_search_params = ("username", "first_name", "last_name")
 
     def get_serializer_class(self):
         if self.action == "list":
             return ProfileListSerializer
         if self.action == "retrieve":
             return ProfileDetailSerializer
+        if self.action == "suggestions":
+            return ProfileSuggestionSerializer
         return ProfileListSerializer
 
     def get_queryset(self):
-        queryset = (
-            Profile.objects.prefetch_related(
-                "following__following", "followers__follower"
-            )
-            .select_related("user")
-            .annotate(
-                followed_by_me=Exists(
-                    FollowingRelationships.objects.filter(
-                        follower__user=self.request.user, following=OuterRef("pk")
-                    )
-                ),
-                followers_count=Count("followers"),
-                following_count=Count("following"),
-            )
-        )
-
-        username = self.request.query_params.get("username")
-        first_name = self.request.query_params.get("first_name")
-        last_name = self.request.query_params.get("last_name")
-
-        if username:
-            queryset = queryset.filter(user__username__icontains=username)
-
-        if first_name:
-            queryset = queryset.filter(first_name__icontains=first_name)
-
-        if last_name:
-            queryset = queryset.filter(last_name__icontains=last_name)
-
+        fields = self.get_serializer_class().selected_fields(self.request)
+        queryset = filter_profiles(profile_queryset(fields), self.request.query_params)
+        if self.action == "list":
+            queryset = queryset.order_by(*profile_ordering(self.request))
         return queryset
 
+    def set_viewer_flags(self, profiles):
+        fields = self.get_serializer_class().selected_fields(self.request)
+        if "followed_by_me" in fields:
+            return set_followed_by_me(profiles, self.request.user.profile)
+        return profiles
+
     @extend_schema(
         parameters=[
             OpenApiParameter(
                 "username",
                 type=OpenApiTypes.STR,
-                description="Filter by username example: ?username=john",
+                description="Filter by username prefix, ignoring case example: ?username=jo",
             ),
             OpenApiParameter(
                 "first_name",
@@ -118,18 +234,101 @@ class ProfileViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, GenericVi
                 type=OpenApiTypes.STR,
                 description="Filter by last name example: ?last_name=john",
             ),
+            OpenApiParameter(
+                "ordering",
+                type=OpenApiTypes.STR,
+                enum=list(PROFILE_ORDERINGS),
+                description="Order by name (the default) or id example: ?ordering=id",
+            ),
+            *SPARSE_FIELDSET_PARAMETERS,
+            STREAM_PARAMETER,
         ]
     )
+    @conditional_get(versioning.profile_list_keys)
     def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return self.list_response(queryset)
+        serializer = self.get_serializer(self.set_viewer_flags(page), many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @conditional_get(versioning.profile_detail_keys)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @action(
+        detail=False,
+        methods=["GET"],
+        url_path="suggestions",
+    )
+    def suggestions(self, request):
+        """Endpoint to get profiles followed by the profiles the user follows"""
+        user_profile = request.user.profile
+        following = follow_graph.following_ids(user_profile.id)
+        suggestions = ProfileSuggestion.objects.filter(
+            profile=user_profile, suggested__user__is_active=True
+        ).select_related("suggested")
+
+        profiles = []
+        for suggestion in suggestions:
+            if follow_graph.contains(following, suggestion.suggested_id):
+                continue
+            suggestion.suggested.score = suggestion.score
+            suggestion.suggested.followed_by_me = False
+            profiles.append(suggestion.suggested)
+
+        serializer = self.get_serializer(profiles, many=True)
+        return Response(serializer.data)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "q",
+                type=OpenApiTypes.STR,
+                description="Username prefix, with or without @ example: ?q=@jo",
+            ),
+            OpenApiParameter(
+                "limit",
+                type=OpenApiTypes.INT,
+                description="Number of usernames to return example: ?limit=5",
+            ),
+        ],
+        responses=ProfileReferenceSerializer(many=True),
+    )
+    @action(
+        detail=False,
+        methods=["GET"],
+        url_path="autocomplete",
+        throttle_scope="search",
+    )
+    def autocomplete(self, request):
+        """Endpoint to complete a username, for searches and @mentions"""
+        config = settings.PROFILE_AUTOCOMPLETE
+        prefix = request.query_params.get("q", "").strip().lstrip("@")
+        if not prefix:
+            return Response([])
+        try:
+            limit = int(request.query_params.get("limit", config["LIMIT"]))
+        except ValueError:
+            raise ValidationError({"limit": "A whole number is required."})
+        limit = min(max(limit, 1), config["MAX_LIMIT"])
+
+        profiles = filter_username_prefix(
+            Profile.objects.active().only("id", "username"), prefix
+        ).order_by("username_normalized")[:limit]
+        serializer = ProfileReferenceSerializer(profiles, many=True)
+        return Response(serializer.data)
 
     @action(
         detail=True,
         methods=["POST"],
         url_path="follow",
+        throttle_scope="engagement",
         permission_classes=[IsAuthenticated],
         authentication_classes=[JWTAuthentication],
     )
+    @transaction.atomic
     def follow(self, request, pk=None):
         follower = get_object_or_404(Profile, user=request.user)
         following = get_object_or_404(Profile, pk=pk)
@@ -149,6 +348,10 @@ class ProfileViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, GenericVi
             )
 
         FollowingRelationships.objects.create(follower=follower, following=following)
+        follow_graph.add_follow(follower.id, following.id)
+        versioning.follow_changed(follower.id, following.id)
+        changelog.record(ChangeLogEntry.FOLLOWING_CHANGED, follower.id)
+        notifications.notify(Notification.FOLLOW, following.id, follower.id)
         return Response(
             {"detail": "You started following this user."},
             status=status.HTTP_204_NO_CONTENT,
@@ -158,6 +361,7 @@ class ProfileViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, GenericVi
         detail=True,
         methods=["POST"],
         url_path="unfollow",
+        throttle_scope="engagement",
         permission_classes=[IsAuthenticated],
         authentication_classes=[JWTAuthentication],
     )
@@ -170,6 +374,9 @@ class ProfileViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, GenericVi
                 Q(follower=follower) & Q(following=following)
             )
             relation.delete()
+            follow_graph.remove_follow(follower.id, following.id)
+            versioning.follow_changed(follower.id, following.id)
+            changelog.record(ChangeLogEntry.FOLLOWING_CHANGED, follower.id)
             return Response(
                 {"detail": "You have unfollowed this user."},
                 status=status.HTTP_204_NO_CONTENT,
@@ -182,31 +389,43 @@ class ProfileViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, GenericVi
 
 
 class ProfileFollowersView(ListAPIView):
-    serializer_class = FollowerRelationshipSerializer
+    serializer_class = ProfileReferenceSerializer
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        user = self.request.user
-        return user.profile.followers.all()
+        follower_ids = follow_graph.follower_ids(self.request.user.profile.id)
+        return (
+            Profile.objects.active()
+            .filter(pk__in=list(follower_ids))
+            .order_by(*PROFILE_ORDERINGS["name"])
+            .only("id", "username")
+        )
 
 
 class ProfileFollowingView(ListAPIView):
-    serializer_class = FollowingRelationshipSerializer
+    serializer_class = ProfileReferenceSerializer
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        user = self.request.user
-        return user.profile.following.all()
+        following_ids = follow_graph.following_ids(self.request.user.profile.id)
+        return (
+            Profile.objects.active()
+            .filter(pk__in=list(following_ids))
+            .order_by(*PROFILE_ORDERINGS["name"])
+            .only("id", "username")
+        )
 
 
-class PostViewSet(viewsets.ModelViewSet):
+class PostViewSet(StreamingListMixin, viewsets.ModelViewSet):
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated, IsAuthorOrReadOnly]
+    throttle_scope = None
+    throttle_search_params = ("content", "author_username", "tag")
 
     def get_serializer_class(self):
-        if self.action == "list":
+        if self.action in ("list", "my_posts", "feed", "trending", "liked"):
             return PostListSerializer
         if self.action == "retrieve":
             return PostDetailSerializer
@@ -215,50 +434,42 @@ class PostViewSet(viewsets.ModelViewSet):
         return PostSerializer
 
     def get_queryset(self):
-        user_profile = self.request.user.profile
-        queryset = (
-            Post.objects.prefetch_related("likes__profile", "comments__author")
-            .select_related("author")
-            .annotate(
-                likes_count=Subquery(
-                    Like.objects.filter(post=OuterRef("pk"))
-                    .values("post")
-                    .annotate(cnt=Count("post"))
-                    .values("cnt")
-                ),
-                comments_count=Subquery(
-                    Comment.objects.filter(post=OuterRef("pk"))
-                    .values("post")
-                    .annotate(cnt=Count("post"))
-                    .values("cnt")
-                ),
-                liked_by_user=Exists(
-                    Like.objects.filter(profile=user_profile, post=OuterRef("pk"))
-                ),
-            )
-        )
-
-        content = self.request.query_params.get("content")
-        author_username = self.request.query_params.get("author_username")
-
-        if author_username is not None:
-            queryset = queryset.filter(author__username__icontains=author_username)
-
-        if content is not None:
-            queryset = queryset.filter(content__icontains=content)
+        fields = self.get_serializer_class().selected_fields(self.request)
+        return filter_posts(post_queryset(fields), self.request.query_params)
 
-        return queryset
+    def set_viewer_flags(self, posts):
+        fields = self.get_serializer_class().selected_fields(self.request)
+        if "liked_by_user" in fields:
+            return set_liked_by_user(posts, self.request.user.profile)
+        return posts
 
     def perform_create(self, serializer):
         scheduled_at = self.request.data.get("scheduled_at")
 
         if scheduled_at:
-            serializer.validated_data["author_id"] = self.request.user.profile.id
-            create_scheduled_post.apply_async(
-                args=[serializer.validated_data], eta=scheduled_at
+            post_data = dict(serializer.validated_data)
+            available_at = post_data.pop("scheduled_at")
+            post_data["author_id"] = self.request.user.profile.id
+            outbox.enqueue(
+                OutboxMessage.SCHEDULED_POST, post_data, available_at=available_at
             )
         else:
-            serializer.save(author=self.request.user.profile)
+            post = serializer.save(author=self.request.user.profile)
+            tags.index_posts([post])
+            versioning.post_changed(post.id, post.author_id)
+            changelog.record(ChangeLogEntry.POST_CREATED, post.author_id, post.id)
+
+    def perform_update(self, serializer):
+        post = serializer.save()
+        tags.index_posts([post])
+        versioning.post_changed(post.id, post.author_id)
+        changelog.record(ChangeLogEntry.POST_UPDATED, post.author_id, post.id)
+
+    def perform_destroy(self, instance):
+        versioning.post_changed(instance.id, instance.author_id)
+        changelog.record(ChangeLogEntry.POST_DELETED, instance.author_id, instance.id)
+        tags.unindex_post(instance)
+        instance.delete()
 
     @extend_schema(
         parameters=[
@@ -272,10 +483,31 @@ class PostViewSet(viewsets.ModelViewSet):
                 type=OpenApiTypes.STR,
                 description="Filter by author username example: ?author_username=john",
             ),
+            OpenApiParameter(
+                "tag",
+                type=OpenApiTypes.STR,
+                description="Filter by hashtag, with or without # example: ?tag=django",
+            ),
+            *SPARSE_FIELDSET_PARAMETERS,
+            STREAM_PARAMETER,
         ]
     )
+    @conditional_get(versioning.post_list_keys)
     def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return self.list_response(queryset)
+        serializer = self.get_serializer(self.set_viewer_flags(page), many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @extend_schema(parameters=SPARSE_FIELDSET_PARAMETERS)
+    @conditional_get(versioning.post_detail_keys)
+    def retrieve(self, request, *args, **kwargs):
+        post = self.get_object()
+        self.set_viewer_flags([post])
+        serializer = self.get_serializer(post)
+        return Response(serializer.data)
 
     @action(
         methods=["POST"],
@@ -287,6 +519,8 @@ class PostViewSet(viewsets.ModelViewSet):
         post = get_object_or_404(Post, pk=pk)
         post.image = request.data.get("image")
         post.save()
+        versioning.post_changed(post.id, post.author_id)
+        changelog.record(ChangeLogEntry.POST_UPDATED, post.author_id, post.id)
         return Response(
             {"detail": "Image uploaded successfully."},
             status=status.HTTP_204_NO_CONTENT,
@@ -296,7 +530,9 @@ class PostViewSet(viewsets.ModelViewSet):
         methods=["POST"],
         detail=True,
         url_path="like",
+        throttle_scope="engagement",
     )
+    @transaction.atomic
     def like(self, request, pk=None):
         """Endpoint to like a post"""
         post = get_object_or_404(Post, pk=pk)
@@ -307,14 +543,35 @@ class PostViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_409_CONFLICT,
             )
         Like.objects.create(profile=user_profile, post=post)
+        transaction.on_commit(lambda: liked_posts_cache.add(user_profile.id, post.id))
+        versioning.like_changed(post, user_profile.id)
+        changelog.record(ChangeLogEntry.ENGAGEMENT, post.author_id, post.id)
+        notifications.notify(
+            Notification.LIKE, post.author_id, user_profile.id, post.id
+        )
         return Response(
             {"detail": "You liked this post."}, status=status.HTTP_204_NO_CONTENT
         )
 
+    @action(
+        methods=["GET"],
+        detail=True,
+        url_path="likes",
+    )
+    def likes(self, request, pk=None):
+        """Endpoint to get the likes of a post, newest first"""
+        post = get_object_or_404(Post.objects.active().only("id"), pk=pk)
+        queryset = Like.objects.filter(post=post).select_related("profile")
+        paginator = LikeCursorPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = LikeSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
     @action(
         methods=["POST"],
         detail=True,
         url_path="unlike",
+        throttle_scope="engagement",
     )
     def unlike(self, request, pk=None):
         """Endpoint to unlike a post"""
@@ -323,6 +580,11 @@ class PostViewSet(viewsets.ModelViewSet):
         try:
             like = Like.objects.get(profile=user_profile, post=post)
             like.delete()
+            transaction.on_commit(
+                lambda: liked_posts_cache.discard(user_profile.id, post.id)
+            )
+            versioning.like_changed(post, user_profile.id)
+            changelog.record(ChangeLogEntry.ENGAGEMENT, post.author_id, post.id)
             return Response(
                 {"detail": "You unliked this post."},
                 status=status.HTTP_204_NO_CONTENT,
@@ -333,46 +595,144 @@ class PostViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
+    @extend_schema(parameters=[*SPARSE_FIELDSET_PARAMETERS, STREAM_PARAMETER])
     @action(
         methods=["GET"],
         detail=False,
         url_path="my-posts",
     )
+    @conditional_get(versioning.my_posts_keys)
     def my_posts(self, request):
         """Endpoint to get all posts from the user"""
         user_profile = request.user.profile
-        queryset = self.get_queryset().filter(author=user_profile)
-        serializer = PostListSerializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(self.get_queryset().filter(author=user_profile))
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "since",
+                type=OpenApiTypes.INT,
+                description="Return only the changes after the X-Feed-Cursor of an "
+                "earlier response example: ?since=1200",
+            ),
+            *SPARSE_FIELDSET_PARAMETERS,
+            STREAM_PARAMETER,
+        ]
+    )
     @action(
         methods=["GET"],
         detail=False,
         url_path="feed",
     )
+    @conditional_get(versioning.feed_keys)
     def feed(self, request):
         """Endpoint to get all posts from followed users"""
         user_profile = request.user.profile
-        followed_profiles = user_profile.following.values_list("following", flat=True)
-        queryset = self.get_queryset().filter(author__in=followed_profiles)
-        serializer = PostListSerializer(queryset, many=True)
+        followed_profiles = follow_graph.following_ids(user_profile.id)
+        cursor = changelog.current_cursor()
+        if "since" in request.query_params:
+            return self.feed_changes(cursor, followed_profiles)
+
+        response = self.list_response(
+            self.get_queryset().filter(author__in=list(followed_profiles))
+        )
+        response["X-Feed-Cursor"] = str(cursor)
+        return response
+
+    def feed_changes(self, cursor, followed_profiles):
+        """
+        The feed changes after ?since= as the new or edited posts, the
+        counts of posts whose likes or comments changed and the ids of the
+        posts which left the feed. With reset set the client has to fetch
+        the whole feed again.
+        """
+        try:
+            since = int(self.request.query_params["since"])
+        except ValueError:
+            raise ValidationError({"since": "A feed cursor is required."})
+        cursor = max(cursor, since)
+
+        max_changes = settings.FEED_CHANGES["MAX_CHANGES"]
+        entries = list(
+            changelog.entries_since(
+                since, self.request.user.profile.id, followed_profiles
+            )[: max_changes + 1]
+        )
+        if (
+            len(entries) > max_changes
+            or changelog.is_pruned(since)
+            or any(kind == ChangeLogEntry.FOLLOWING_CHANGED for kind, _ in entries)
+        ):
+            return Response({"cursor": cursor, "reset": True})
+
+        edited, engaged = set(), set()
+        for kind, post_id in entries:
+            if kind == ChangeLogEntry.ENGAGEMENT:
+                engaged.add(post_id)
+            else:
+                edited.add(post_id)
+        changed = edited | engaged
+
+        posts = self.set_viewer_flags(self.get_queryset().filter(pk__in=changed))
+        removed = changed - {post.pk for post in posts}
+        edited_posts = [post for post in posts if post.pk in edited]
+        engaged_posts = [post for post in posts if post.pk not in edited]
+        return Response(
+            {
+                "cursor": cursor,
+                "reset": False,
+                "posts": self.get_serializer(edited_posts, many=True).data,
+                "counts": PostCountsSerializer(engaged_posts, many=True).data,
+                "removed": sorted(removed),
+            }
+        )
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "limit",
+                type=OpenApiTypes.INT,
+                description="Number of posts to return example: ?limit=10",
+            ),
+        ]
+    )
+    @action(
+        methods=["GET"],
+        detail=False,
+        url_path="trending",
+    )
+    def trending(self, request):
+        """Endpoint to get the posts with the most recent likes and comments"""
+        config = settings.TRENDING_POSTS
+        try:
+            limit = int(request.query_params.get("limit", config["LIMIT"]))
+        except ValueError:
+            limit = config["LIMIT"]
+        limit = min(max(limit, 1), config["MAX_LIMIT"])
+
+        queryset = self.get_queryset().filter(trending_score__isnull=False)
+        queryset = queryset.order_by("-trending_score__score")[:limit]
+        serializer = self.get_serializer(self.set_viewer_flags(queryset), many=True)
         return Response(serializer.data)
 
+    @extend_schema(parameters=[*SPARSE_FIELDSET_PARAMETERS, STREAM_PARAMETER])
     @action(
         methods=["GET"],
         detail=False,
         url_path="liked",
     )
+    @conditional_get(versioning.post_list_keys)
     def liked(self, request):
         """Endpoint to get all posts liked by the user"""
         user_profile = request.user.profile
-        queryset = self.get_queryset().filter(likes__profile=user_profile)
-        serializer = PostListSerializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(
+            self.get_queryset().filter(likes__profile=user_profile)
+        )
 
 
 class CommentViewSet(viewsets.ModelViewSet):
     serializer_class = CommentSerializer
+    pagination_class = CommentCursorPagination
     permission_classes = [IsAuthenticated, IsAuthorOrReadOnly]
 
     def get_queryset(self):
@@ -381,6 +741,81 @@ class CommentViewSet(viewsets.ModelViewSet):
         )
         return queryset
 
+    @transaction.atomic
     def perform_create(self, serializer):
         post = get_object_or_404(Post, id=self.kwargs.get("post_id"))
-        serializer.save(author=self.request.user.profile, post=post)
+        comment = serializer.save(author=self.request.user.profile, post=post)
+        versioning.post_changed(post.id, post.author_id)
+        changelog.record(ChangeLogEntry.ENGAGEMENT, post.author_id, post.id)
+        notifications.notify(
+            Notification.COMMENT, post.author_id, comment.author_id, post.id
+        )
+
+    def perform_update(self, serializer):
+        comment = serializer.save()
+        versioning.post_changed(comment.post_id, comment.post.author_id)
+
+    def perform_destroy(self, instance):
+        versioning.post_changed(instance.post_id, instance.post.author_id)
+        changelog.record(
+            ChangeLogEntry.ENGAGEMENT, instance.post.author_id, instance.post_id
+        )
+        instance.delete()
+
+
+class NotificationViewSet(mixins.ListModelMixin, GenericViewSet):
+    """Notifications of the current profile, most recently updated first"""
+
+    serializer_class = NotificationSerializer
+    pagination_class = NotificationCursorPagination
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return Notification.objects.filter(
+            recipient=self.request.user.profile
+        ).select_related("latest_actor")
+
+    @extend_schema(responses=UnreadCountSerializer)
+    @action(methods=["GET"], detail=False, url_path="unread-count")
+    def unread_count(self, request):
+        count = notifications.unread_count(request.user.profile.id)
+        return Response(UnreadCountSerializer({"unread": count}).data)
+
+    @extend_schema(request=None, responses={status.HTTP_204_NO_CONTENT: None})
+    @action(methods=["POST"], detail=False, url_path="read")
+    def read(self, request):
+        """Mark all notifications read"""
+        notifications.mark_read(request.user.profile.id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+@extend_schema_view(
+    list=extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "limit",
+                type=OpenApiTypes.INT,
+                description="Number of hashtags to return example: ?limit=10",
+            ),
+        ]
+    )
+)
+class HashtagViewSet(mixins.ListModelMixin, GenericViewSet):
+    """The hashtags used in the most posts, see posts/?tag= for their posts"""
+
+    serializer_class = HashtagSerializer
+    pagination_class = None
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        config = settings.HASHTAGS
+        try:
+            limit = int(self.request.query_params.get("limit", config["LIMIT"]))
+        except ValueError:
+            limit = config["LIMIT"]
+        limit = min(max(limit, 1), config["MAX_LIMIT"])
+        return Hashtag.objects.filter(post_count__gt=0).order_by("-post_count", "name")[
+            :limit
+        ]
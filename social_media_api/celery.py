@@ -1,6 +1,9 @@
 import os
 
 from celery import Celery
+from celery.signals import before_task_publish, task_postrun, task_prerun
+
+from social_media_api import task_metrics
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "social_media_api.settings")
@@ -16,6 +19,12 @@ app.config_from_object("django.conf:settings", namespace="CELERY")
 # Load task modules from all registered Django apps.
 app.autodiscover_tasks()
 
+# Record queue wait, run time and failures of every task, see
+# social_media_api.task_metrics
+before_task_publish.connect(task_metrics.stamp_published_at)
+task_prerun.connect(task_metrics.start_run)
+task_postrun.connect(task_metrics.finish_run)
+
 
 @app.task(bind=True)
 def debug_task(self):
@@ -0,0 +1,139 @@
+import gzip
+import hashlib
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
+
+from social_media_api.instrumentation import current_timings
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/vnd.oai.openapi",
+    "application/javascript",
+    "text/",
+)
+
+
+def accepted_encodings(request):
+    """Content codings the client accepts, with a non-zero quality"""
+    accepted = set()
+    for item in request.headers.get("Accept-Encoding", "").split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def compress(content, encoding):
+    config = settings.RESPONSE_COMPRESSION
+    if encoding == "br":
+        return brotli.compress(content, quality=config["BROTLI_LEVEL"])
+    return gzip.compress(content, compresslevel=config["GZIP_LEVEL"], mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    Compress responses of compressible types with brotli (when installed)
+    or gzip, as negotiated by Accept-Encoding. Bodies smaller than MIN_SIZE
+    are sent as they are. The compressed bytes of responses carrying an
+    ETag are cached, so unchanged hot responses are compressed only once.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def negotiate(self, request, streaming):
+        accepted = accepted_encodings(request)
+        if brotli is not None and "br" in accepted and not streaming:
+            return "br"
+        if "gzip" in accepted:
+            return "gzip"
+        return None
+
+    def is_compressible(self, response):
+        content_type = response.get("Content-Type", "")
+        return (
+            not response.has_header("Content-Encoding")
+            and not (response.streaming and response.is_async)
+            and response.status_code not in (204, 304)
+            and content_type.startswith(COMPRESSIBLE_TYPES)
+        )
+
+    def process_response(self, request, response):
+        if not self.is_compressible(response):
+            return response
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        encoding = self.negotiate(request, response.streaming)
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = compress_sequence(response.streaming_content)
+            del response["Content-Length"]
+        else:
+            if len(response.content) < settings.RESPONSE_COMPRESSION["MIN_SIZE"]:
+                return response
+            response.content = self.compressed_content(request, response, encoding)
+            response["Content-Length"] = str(len(response.content))
+
+        # The compressed representation differs from the uncompressed one
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        response["Content-Encoding"] = encoding
+        return response
+
+    def compressed_content(self, request, response, encoding):
+        etag = response.get("ETag")
+        key = None
+        if etag:
+            config = settings.RESPONSE_COMPRESSION
+            level = config["BROTLI_LEVEL" if encoding == "br" else "GZIP_LEVEL"]
+            digest = hashlib.sha256(
+                f"{etag}|{request.get_full_path()}".encode()
+            ).hexdigest()
+            key = f"compressed:{encoding}:{level}:{digest}"
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+
+        start = time.perf_counter()
+        content = compress(response.content, encoding)
+        timings = current_timings()
+        if timings is not None:
+            timings.compression += time.perf_counter() - start
+
+        if key is not None:
+            cache.set(
+                key, content, timeout=settings.RESPONSE_COMPRESSION["CACHE_TIMEOUT"]
+            )
+        return content
@@ -0,0 +1,131 @@
+import threading
+import time
+
+from social_media_api.instrumentation import Histogram, current_timings
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    """
+    Bounded per-process pool of database connections.
+
+    At most MAX_SIZE connections are handed out at once, callers wait up to
+    TIMEOUT seconds for a free one. Idle connections older than
+    MAX_IDLE_SECONDS are closed instead of being reused.
+    """
+
+    def __init__(self, name, max_size, timeout, max_idle_seconds):
+        self.name = name
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle_seconds = max_idle_seconds
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._idle = []
+        self.in_use = 0
+        self.created = 0
+        self.timeouts = 0
+        self.wait_ms = Histogram()
+
+    def acquire(self, connect):
+        """Return an idle or new connection with its isolation level"""
+        start = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise TimeoutError(
+                f"No connection available in pool {self.name} "
+                f"after {self.timeout} seconds"
+            )
+        waited = time.perf_counter() - start
+
+        stale = []
+        with self._lock:
+            self.in_use += 1
+            self.wait_ms.observe(waited * 1000)
+            entry = None
+            while self._idle:
+                connection, isolation_level, released_at = self._idle.pop()
+                if (
+                    connection.closed
+                    or time.monotonic() - released_at > self.max_idle_seconds
+                ):
+                    stale.append(connection)
+                    continue
+                entry = connection, isolation_level
+                break
+        for connection in stale:
+            self._discard(connection)
+
+        if entry is None:
+            try:
+                entry = connect()
+            except BaseException:
+                self._free_slot()
+                raise
+            with self._lock:
+                self.created += 1
+
+        timings = current_timings()
+        if timings is not None:
+            timings.pool_wait += waited
+        return entry
+
+    def release(self, connection, isolation_level, reusable):
+        if reusable and not connection.closed:
+            with self._lock:
+                self._idle.append((connection, isolation_level, time.monotonic()))
+        else:
+            self._discard(connection)
+        self._free_slot()
+
+    def _free_slot(self):
+        with self._lock:
+            self.in_use -= 1
+        self._slots.release()
+
+    @staticmethod
+    def _discard(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_size": self.max_size,
+                "in_use": self.in_use,
+                "idle": len(self._idle),
+                "saturation": round(self.in_use / self.max_size, 2),
+                "created": self.created,
+                "timeouts": self.timeouts,
+                "wait": self.wait_ms.as_dict(),
+            }
+
+
+def get_pool(alias, settings_dict):
+    key = (alias, settings_dict["HOST"], settings_dict["PORT"], settings_dict["NAME"])
+    pool = _pools.get(key)
+    if pool is None:
+        options = settings_dict.get("POOL", {})
+        with _pools_lock:
+            pool = _pools.setdefault(
+                key,
+                ConnectionPool(
+                    name=alias,
+                    max_size=options.get("MAX_SIZE", 10),
+                    timeout=options.get("TIMEOUT", 10),
+                    max_idle_seconds=options.get("MAX_IDLE_SECONDS", 300),
+                ),
+            )
+    return pool
+
+
+def pool_stats():
+    """Statistics of every connection pool of this process"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {pool.name: pool.stats() for pool in pools}
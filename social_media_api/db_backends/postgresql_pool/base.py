@@ -0,0 +1,41 @@
+from django.db.backends.postgresql.base import (
+    DatabaseWrapper as PostgreSQLDatabaseWrapper,
+)
+
+from social_media_api.db_backends.pool import get_pool
+
+
+class DatabaseWrapper(PostgreSQLDatabaseWrapper):
+    """PostgreSQL backend taking its connections from a per-process pool"""
+
+    def get_new_connection(self, conn_params):
+        connect = super().get_new_connection
+
+        def create():
+            connection = connect(conn_params)
+            return connection, self.isolation_level
+
+        try:
+            connection, self.isolation_level = get_pool(
+                self.alias, self.settings_dict
+            ).acquire(create)
+        except TimeoutError as exc:
+            raise self.Database.OperationalError(str(exc)) from exc
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        get_pool(self.alias, self.settings_dict).release(
+            self.connection, self.isolation_level, self._reset_for_reuse()
+        )
+
+    def _reset_for_reuse(self):
+        """Roll back any open transaction, a connection closed mid-atomic is dropped"""
+        if self.in_atomic_block or self.connection.closed:
+            return False
+        try:
+            self.connection.rollback()
+        except self.Database.Error:
+            return False
+        return True
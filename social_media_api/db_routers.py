@@ -0,0 +1,175 @@
+import contextvars
+import logging
+import random
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+_replica_reads_allowed = contextvars.ContextVar("replica_reads_allowed", default=False)
+
+
+def replica_aliases():
+    return [alias for alias in connections if alias != DEFAULT_DB_ALIAS]
+
+
+class ReplicaHealth:
+    """
+    Per-process replica health, a replica failing to connect is skipped
+    until REPLICA_RETRY_SECONDS have passed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._down_until = {}
+        self._checked_at = {}
+
+    def is_healthy(self, alias):
+        now = time.monotonic()
+        if self._down_until.get(alias, 0) > now:
+            return False
+        if now - self._checked_at.get(alias, 0) < settings.REPLICA_HEALTH_CHECK_SECONDS:
+            return True
+
+        with self._lock:
+            self._checked_at[alias] = now
+        try:
+            connections[alias].ensure_connection()
+        except DatabaseError:
+            logger.warning("Database replica %s is unavailable", alias, exc_info=True)
+            self.mark_down(alias)
+            return False
+        return True
+
+    def mark_down(self, alias):
+        with self._lock:
+            self._down_until[alias] = time.monotonic() + settings.REPLICA_RETRY_SECONDS
+
+
+replica_health = ReplicaHealth()
+
+
+class PrimaryReplicaRouter:
+    """
+    Send reads of the routed apps to a healthy replica during safe requests
+    of clients which haven't written recently, everything else to the primary.
+    """
+
+    route_app_labels = {"core_social", "user"}
+
+    def db_for_read(self, model, **hints):
+        if (
+            model._meta.app_label not in self.route_app_labels
+            or not _replica_reads_allowed.get()
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+
+        healthy = [
+            alias for alias in replica_aliases() if replica_health.is_healthy(alias)
+        ]
+        return random.choice(healthy) if healthy else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+
+def _pin_key(user_id):
+    return f"primary-pin:{user_id}"
+
+
+def pin_to_primary(user_id):
+    """
+    Read from the primary for the user during PRIMARY_STICKINESS_SECONDS.
+    Also called when a token is issued, so its first requests find the user.
+    """
+    if replica_aliases() and settings.SHARED_CACHE:
+        cache.set(_pin_key(user_id), True, timeout=settings.PRIMARY_STICKINESS_SECONDS)
+
+
+def token_user_id(request):
+    """Id of the user the request's access token was issued to, if valid"""
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    if header is None:
+        return None
+    try:
+        raw_token = authentication.get_raw_token(header)
+        if raw_token is None:
+            return None
+        token = authentication.get_validated_token(raw_token)
+    except AuthenticationFailed:
+        return None
+    return token.get(api_settings.USER_ID_CLAIM)
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Allow replica reads for safe requests and keep a user on the primary
+    for PRIMARY_STICKINESS_SECONDS after they have written or were issued a
+    token, so they read their own writes. The pins must be seen by every
+    process, so replicas are only read with SHARED_CACHE.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not replica_aliases() or not settings.SHARED_CACHE:
+            return self.get_response(request)
+
+        user_id = token_user_id(request)
+        token = _replica_reads_allowed.set(self.allow_replica_reads(request, user_id))
+        try:
+            response = self.get_response(request)
+        finally:
+            _replica_reads_allowed.reset(token)
+        return self.pin_writer(request, user_id, response)
+
+    async def __acall__(self, request):
+        if not replica_aliases() or not settings.SHARED_CACHE:
+            return await self.get_response(request)
+
+        user_id = token_user_id(request)
+        token = _replica_reads_allowed.set(self.allow_replica_reads(request, user_id))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _replica_reads_allowed.reset(token)
+        return self.pin_writer(request, user_id, response)
+
+    @staticmethod
+    def allow_replica_reads(request, user_id):
+        if request.method not in SAFE_METHODS:
+            return False
+        return user_id is None or not cache.get(_pin_key(user_id))
+
+    @staticmethod
+    def pin_writer(request, user_id, response):
+        if (
+            user_id is not None
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+        ):
+            pin_to_primary(user_id)
+        return response
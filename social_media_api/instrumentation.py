@@ -0,0 +1,285 @@
+import bisect
+import contextvars
+import json
+import logging
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (in milliseconds) of the histogram buckets, the last bucket
+# collects everything slower than the final bound.
+HISTOGRAM_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_current_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+class RequestTimings:
+    """Timings collected while a single request is being handled."""
+
+    __slots__ = (
+        "queries",
+        "db",
+        "pool_wait",
+        "serializer",
+        "view",
+        "compression",
+        "_serializer_depth",
+    )
+
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.pool_wait = 0.0
+        self.serializer = 0.0
+        self.view = 0.0
+        self.compression = 0.0
+        self._serializer_depth = 0
+
+    def as_dict(self):
+        return {
+            "queries": self.queries,
+            "db_ms": round(self.db * 1000, 2),
+            "pool_wait_ms": round(self.pool_wait * 1000, 2),
+            "serializer_ms": round(self.serializer * 1000, 2),
+            "view_ms": round(self.view * 1000, 2),
+            "compression_ms": round(self.compression * 1000, 2),
+        }
+
+    def server_timing(self):
+        metrics = [
+            f'db;dur={self.db * 1000:.2f};desc="{self.queries} queries"',
+            f"serializer;dur={self.serializer * 1000:.2f}",
+            f"view;dur={self.view * 1000:.2f}",
+        ]
+        if self.pool_wait:
+            metrics.append(f"db-pool;dur={self.pool_wait * 1000:.2f}")
+        if self.compression:
+            metrics.append(f"compression;dur={self.compression * 1000:.2f}")
+        return ", ".join(metrics)
+
+
+def current_timings():
+    """Return the timings of the request being handled, if any."""
+    return _current_timings.get()
+
+
+class Histogram:
+    """Fixed-bucket latency histogram."""
+
+    __slots__ = ("buckets", "count", "total", "max")
+
+    def __init__(self):
+        self.buckets = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value_ms):
+        self.buckets[bisect.bisect_left(HISTOGRAM_BUCKETS_MS, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+        self.max = max(self.max, value_ms)
+
+    def as_dict(self):
+        labels = [f"le_{bound}" for bound in HISTOGRAM_BUCKETS_MS] + ["inf"]
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count, 2) if self.count else 0.0,
+            "max_ms": round(self.max, 2),
+            "buckets": dict(zip(labels, self.buckets)),
+        }
+
+
+class TimingRegistry:
+    """Per-process aggregation of request timings by resolved view name."""
+
+    metrics = (
+        "db_ms",
+        "pool_wait_ms",
+        "serializer_ms",
+        "view_ms",
+        "compression_ms",
+        "queries",
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def observe(self, view_name, timings):
+        values = timings.as_dict()
+        with self._lock:
+            histograms = self._views.get(view_name)
+            if histograms is None:
+                histograms = {metric: Histogram() for metric in self.metrics}
+                self._views[view_name] = histograms
+            for metric, histogram in histograms.items():
+                histogram.observe(values[metric])
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                view_name: {
+                    metric: histogram.as_dict()
+                    for metric, histogram in histograms.items()
+                }
+                for view_name, histograms in self._views.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+timing_registry = TimingRegistry()
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper adding query time to the current request."""
+    timings = _current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries += 1
+        timings.db += time.perf_counter() - start
+
+
+def install_execute_wrapper(wrapper, connection):
+    if wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(wrapper)
+
+
+def _install_query_recorder(sender, connection, **kwargs):
+    install_execute_wrapper(record_query, connection)
+
+
+class TimedSerializerMixin:
+    """
+    Add the time spent building the outermost representation
+    to the serializer time of the current request.
+    """
+
+    def to_representation(self, instance):
+        timings = _current_timings.get()
+        if timings is None or timings._serializer_depth:
+            return super().to_representation(instance)
+
+        timings._serializer_depth += 1
+        start = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            timings.serializer += time.perf_counter() - start
+            timings._serializer_depth -= 1
+
+
+class RequestTimingMiddleware:
+    """
+    Record query count, database, serializer, view and compression time of
+    every request, emit them as a Server-Timing header and a structured log
+    line and aggregate them per resolved view name. The view time is
+    recorded by ViewTimingMiddleware, innermost in MIDDLEWARE.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        connection_created.connect(
+            _install_query_recorder, dispatch_uid="request_timing_query_recorder"
+        )
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        timings, token = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_timings.reset(token)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings, token = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_timings.reset(token)
+        return self.finish(request, response, timings)
+
+    def start(self, request):
+        for connection in connections.all():
+            install_execute_wrapper(record_query, connection)
+
+        timings = RequestTimings()
+        return timings, _current_timings.set(timings)
+
+    def finish(self, request, response, timings):
+        match = getattr(request, "resolver_match", None)
+        view_name = match.view_name if match else "unresolved"
+
+        response["Server-Timing"] = timings.server_timing()
+        timing_registry.observe(view_name, timings)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                json.dumps(
+                    {
+                        "event": "request_timing",
+                        "view": view_name,
+                        "method": request.method,
+                        "status": response.status_code,
+                        **timings.as_dict(),
+                    }
+                )
+            )
+        return response
+
+
+class ViewTimingMiddleware:
+    """
+    Record the view time of the request timed by RequestTimingMiddleware.
+    Listed last in MIDDLEWARE, so no other middleware is included.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        start = time.perf_counter()
+        try:
+            return self.get_response(request)
+        finally:
+            self.record(start)
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        try:
+            return await self.get_response(request)
+        finally:
+            self.record(start)
+
+    def record(self, start):
+        timings = _current_timings.get()
+        if timings is not None:
+            timings.view = time.perf_counter() - start
@@ -0,0 +1,155 @@
+import contextvars
+import logging
+import random
+import re
+import traceback
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from social_media_api.instrumentation import install_execute_wrapper
+
+logger = logging.getLogger(__name__)
+
+IN_LIST_PATTERN = re.compile(r"\(%s(?:, %s)+\)")
+
+_current_request = contextvars.ContextVar("n_plus_one_request", default=None)
+
+
+class NPlusOneQueryError(Exception):
+    """Raised when the same query shape repeats within one request."""
+
+
+def query_shape(sql):
+    """Return the SQL with variable length IN lists collapsed."""
+    return IN_LIST_PATTERN.sub("(%s...)", sql)
+
+
+class QueryShapeTracker:
+    """Count identical-shape queries executed by a single view."""
+
+    def __init__(self, view_name, threshold, raise_error):
+        self.view_name = view_name
+        self.threshold = threshold
+        self.raise_error = raise_error
+        self.shapes = Counter()
+        self.stacks = {}
+
+    def track(self, sql):
+        shape = query_shape(sql)
+        self.shapes[shape] += 1
+        if self.shapes[shape] != self.threshold:
+            return
+
+        if self.raise_error:
+            raise NPlusOneQueryError(
+                f"Query repeated {self.threshold} times in {self.view_name}: {shape}"
+            )
+        self.stacks[shape] = "".join(traceback.format_stack()[:-2])
+
+    def report(self):
+        for shape, stack in self.stacks.items():
+            logger.warning(
+                "Possible N+1 query in %s, executed %d times: %s\n%s",
+                self.view_name,
+                self.shapes[shape],
+                shape,
+                stack,
+            )
+
+
+def track_query(execute, sql, params, many, context):
+    """Database execute wrapper feeding the current query shape tracker."""
+    request = _current_request.get()
+    if request is not None and request._n_plus_one_tracker is not None:
+        request._n_plus_one_tracker.track(sql)
+    return execute(sql, params, many, context)
+
+
+def _install_query_tracker(sender, connection, **kwargs):
+    install_execute_wrapper(track_query, connection)
+
+
+class NPlusOneDetectionMiddleware:
+    """
+    Detect queries of identical shape repeated within one request.
+
+    In "raise" mode (used by the test runner) the offending query raises
+    NPlusOneQueryError, in "log" mode a sampled share of requests is
+    tracked and a warning with the stack trace is logged.
+    Views can set `n_plus_one_threshold` to override the threshold,
+    `0` disables the detection for the view.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        connection_created.connect(
+            _install_query_tracker, dispatch_uid="n_plus_one_query_tracker"
+        )
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.sample(request):
+            return self.get_response(request)
+
+        token = _current_request.set(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_request.reset(token)
+        return self.report(request, response)
+
+    async def __acall__(self, request):
+        if not self.sample(request):
+            return await self.get_response(request)
+
+        token = _current_request.set(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_request.reset(token)
+        return self.report(request, response)
+
+    def sample(self, request):
+        config = settings.N_PLUS_ONE_DETECTION
+        mode = config["MODE"]
+        request._n_plus_one_tracker = None
+        request._n_plus_one_sampled = mode == "raise" or (
+            mode == "log" and random.random() < config["SAMPLE_RATE"]
+        )
+        if request._n_plus_one_sampled:
+            for connection in connections.all():
+                install_execute_wrapper(track_query, connection)
+        return request._n_plus_one_sampled
+
+    def report(self, request, response):
+        if request._n_plus_one_tracker is not None:
+            request._n_plus_one_tracker.report()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not request._n_plus_one_sampled:
+            return None
+
+        config = settings.N_PLUS_ONE_DETECTION
+        threshold = getattr(
+            getattr(view_func, "cls", view_func),
+            "n_plus_one_threshold",
+            config["THRESHOLD"],
+        )
+        if threshold:
+            request._n_plus_one_tracker = QueryShapeTracker(
+                request.resolver_match.view_name,
+                threshold,
+                raise_error=config["MODE"] == "raise",
+            )
+        return None
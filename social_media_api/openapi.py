@@ -0,0 +1,39 @@
+from django.conf import settings
+
+# drf_spectacular is a development app, left out of the production profile.
+# Without it the schema annotations are kept as no-ops so the views and
+# serializers are importable with the package not installed.
+
+if "drf_spectacular" in settings.INSTALLED_APPS:
+    from drf_spectacular.types import OpenApiTypes
+    from drf_spectacular.utils import (
+        OpenApiParameter,
+        extend_schema,
+        extend_schema_field,
+        extend_schema_view,
+    )
+else:
+
+    class OpenApiTypes:
+        STR = str
+        INT = int
+        BOOL = bool
+        OBJECT = dict
+
+    class OpenApiParameter:
+        def __init__(self, *args, **kwargs):
+            pass
+
+    def extend_schema(*args, **kwargs):
+        return lambda target: target
+
+    extend_schema_field = extend_schema
+    extend_schema_view = extend_schema
+
+__all__ = (
+    "OpenApiParameter",
+    "OpenApiTypes",
+    "extend_schema",
+    "extend_schema_field",
+    "extend_schema_view",
+)
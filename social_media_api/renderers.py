@@ -0,0 +1,66 @@
+from itertools import islice
+
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+ORJSON_OPTIONS = (
+    orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS if orjson else 0
+)
+
+_fallback_encoder = JSONEncoder()
+
+
+def dumps(data, indent=None):
+    """Encode data as UTF-8 JSON with orjson when it is installed"""
+    if orjson is None or indent not in (None, 2):
+        return JSONRenderer().render(
+            data, renderer_context={"indent": indent} if indent else None
+        )
+    options = ORJSON_OPTIONS | (orjson.OPT_INDENT_2 if indent else 0)
+    encoded = orjson.dumps(data, default=_fallback_encoder.default, option=options)
+    # Escaped like JSONRenderer, as they end lines in JavaScript
+    return encoded.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+        b"\xe2\x80\xa9", b"\\u2029"
+    )
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer encoding with orjson when it is installed. Types orjson
+    doesn't handle natively, datetimes included, go through DRF's encoder
+    so the output matches JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        return dumps(data, indent=indent)
+
+
+class StreamingJSONListResponse(StreamingHttpResponse):
+    """
+    JSON array written a chunk at a time. serialize_chunk turns a list of
+    up to chunk_size rows into a list of representations.
+    """
+
+    def __init__(self, rows, serialize_chunk, chunk_size, **kwargs):
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(self._encode(rows, serialize_chunk, chunk_size), **kwargs)
+
+    @staticmethod
+    def _encode(rows, serialize_chunk, chunk_size):
+        rows = iter(rows)
+        separator = b"["
+        while chunk := list(islice(rows, chunk_size)):
+            encoded = dumps(serialize_chunk(chunk))[1:-1]
+            if encoded:
+                yield separator + encoded
+                separator = b","
+        yield b"[]" if separator == b"[" else b"]"
@@ -0,0 +1,86 @@
+import hashlib
+import json
+import threading
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+
+# The OpenAPI schema only changes with the code, so it is rendered once per
+# process: read from the file written at build time, or generated by
+# drf_spectacular on the first request. Processes running the same
+# CODE_VERSION share a generated schema through the cache.
+
+FORMATS = {
+    "yaml": "application/vnd.oai.openapi; charset=utf-8",
+    "json": "application/vnd.oai.openapi+json; charset=utf-8",
+}
+
+_documents = {}
+_lock = threading.Lock()
+
+
+class SchemaDocument:
+    def __init__(self, content, version):
+        self.content = content
+        self.version = version
+        self.etag = '"%s"' % hashlib.sha256(content).hexdigest()[:32]
+
+
+def _generate():
+    """The schema rendered as YAML and JSON by drf_spectacular"""
+    from drf_spectacular.generators import SchemaGenerator
+    from drf_spectacular.renderers import OpenApiYamlRenderer
+
+    schema = SchemaGenerator().get_schema(request=None, public=True)
+    return {
+        "yaml": OpenApiYamlRenderer().render(schema),
+        "json": json.dumps(schema, cls=DjangoJSONEncoder, indent=2).encode(),
+    }
+
+
+def _read_file():
+    """The schema written at build time, as YAML and JSON"""
+    import yaml
+
+    content = settings.OPENAPI_SCHEMA["FILE"].read_bytes()
+    schema = yaml.safe_load(content)
+    return {
+        "yaml": content,
+        "json": json.dumps(schema, cls=DjangoJSONEncoder, indent=2).encode(),
+    }
+
+
+def _render():
+    if not apps.is_installed("drf_spectacular"):
+        return _read_file()
+    code_version = settings.OPENAPI_SCHEMA["CODE_VERSION"]
+    if not code_version:
+        return _generate()
+    key = f"openapi-schema:{code_version}"
+    contents = cache.get(key)
+    if contents is None:
+        contents = _generate()
+        cache.set(key, contents, timeout=None)
+    return contents
+
+
+def schema_document(schema_format):
+    """
+    The schema in schema_format. Its version, the hash of the YAML schema,
+    names the schema in its immutable URL. Raises FileNotFoundError when
+    the schema must be read from a file that was not written.
+    """
+    if not _documents:
+        with _lock:
+            if not _documents:
+                contents = _render()
+                version = hashlib.sha256(contents["yaml"]).hexdigest()[:16]
+                _documents.update(
+                    {
+                        name: SchemaDocument(content, version)
+                        for name, content in contents.items()
+                    }
+                )
+    return _documents[schema_format]
@@ -26,10 +26,17 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = os.getenv("SECRET_KEY")
 
+# "production" leaves out the apps, middleware and routes used only in
+# development, so web and worker processes start without importing them
+
+SETTINGS_PROFILE = os.getenv("SETTINGS_PROFILE", "development")
+
+PRODUCTION = SETTINGS_PROFILE == "production"
+
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = not PRODUCTION
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = list(filter(None, os.getenv("ALLOWED_HOSTS", "").split(",")))
 
 INTERNAL_IPS = [
     "127.0.0.1",
@@ -53,7 +60,23 @@ INSTALLED_APPS = [
     "core_social",
 ]
 
+# The admin stays available in production unless ADMIN_ENABLED = False
+
+ADMIN_ENABLED = os.getenv("ADMIN_ENABLED", "True") == "True"
+
+DEVELOPMENT_APPS = ["debug_toolbar", "drf_spectacular"]
+
+if PRODUCTION:
+    INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in DEVELOPMENT_APPS]
+
+if not ADMIN_ENABLED:
+    INSTALLED_APPS.remove("django.contrib.admin")
+
 MIDDLEWARE = [
+    "social_media_api.instrumentation.RequestTimingMiddleware",
+    "social_media_api.compression.CompressionMiddleware",
+    "social_media_api.nplusone.NPlusOneDetectionMiddleware",
+    "social_media_api.db_routers.ReplicaRoutingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "debug_toolbar.middleware.DebugToolbarMiddleware",
@@ -62,8 +85,12 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "social_media_api.instrumentation.ViewTimingMiddleware",
 ]
 
+if PRODUCTION:
+    MIDDLEWARE.remove("debug_toolbar.middleware.DebugToolbarMiddleware")
+
 ROOT_URLCONF = "social_media_api.urls"
 
 TEMPLATES = [
@@ -94,6 +121,83 @@ DATABASES = {
     }
 }
 
+# PostgreSQL with a per-process connection pool when POSTGRES_DB is set
+
+if os.getenv("POSTGRES_DB"):
+    DATABASES["default"] = {
+        "ENGINE": "social_media_api.db_backends.postgresql_pool",
+        "NAME": os.getenv("POSTGRES_DB"),
+        "USER": os.getenv("POSTGRES_USER"),
+        "PASSWORD": os.getenv("POSTGRES_PASSWORD"),
+        "HOST": os.getenv("POSTGRES_HOST"),
+        "PORT": os.getenv("POSTGRES_PORT", "5432"),
+        "POOL": {
+            "MAX_SIZE": int(os.getenv("DATABASE_POOL_MAX_SIZE", 10)),
+            "TIMEOUT": float(os.getenv("DATABASE_POOL_TIMEOUT", 10)),
+            "MAX_IDLE_SECONDS": int(os.getenv("DATABASE_POOL_MAX_IDLE_SECONDS", 300)),
+        },
+    }
+
+DATABASES["default"]["CONN_MAX_AGE"] = int(os.getenv("DATABASE_CONN_MAX_AGE", 60))
+DATABASES["default"]["CONN_HEALTH_CHECKS"] = (
+    os.getenv("DATABASE_CONN_HEALTH_CHECKS", "True") == "True"
+)
+
+# Threads running the concurrent queries of the async views, each holding a
+# connection only while its query runs. Half the pool by default, so the
+# requests' own connections keep the other half
+
+ASYNC_QUERY_WORKERS = int(
+    os.getenv(
+        "ASYNC_QUERY_WORKERS",
+        max(1, DATABASES["default"].get("POOL", {}).get("MAX_SIZE", 10) // 2),
+    )
+)
+
+# Read replicas, a comma separated list of replica hosts for PostgreSQL
+# or database files for SQLite, sharing the rest of the default settings
+
+for index, replica in enumerate(
+    filter(None, os.getenv("DATABASE_REPLICAS", "").split(",")), start=1
+):
+    DATABASES[f"replica_{index}"] = {
+        **DATABASES["default"],
+        ("HOST" if os.getenv("POSTGRES_DB") else "NAME"): replica.strip(),
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["social_media_api.db_routers.PrimaryReplicaRouter"]
+
+# Seconds a user reads from the primary after a write or being issued a token,
+# replicas are only read when SHARED_CACHE is set
+PRIMARY_STICKINESS_SECONDS = int(os.getenv("PRIMARY_STICKINESS_SECONDS", 10))
+
+REPLICA_HEALTH_CHECK_SECONDS = int(os.getenv("REPLICA_HEALTH_CHECK_SECONDS", 5))
+
+REPLICA_RETRY_SECONDS = int(os.getenv("REPLICA_RETRY_SECONDS", 30))
+
+# Cache, shared through Redis when CACHE_REDIS_URL is set
+
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL")
+
+CACHES = {
+    "default": (
+        {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_REDIS_URL,
+        }
+        if CACHE_REDIS_URL
+        else {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    )
+}
+
+# Whether every web and worker process sees the same default cache. The
+# conditional GET stamps, follow graph, replica stickiness and task metrics
+# live in it and are turned off without one, as each process of the local
+# memory cache would see its own copy
+
+SHARED_CACHE = os.getenv("SHARED_CACHE", str(bool(CACHE_REDIS_URL))) == "True"
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -146,8 +250,100 @@ REST_FRAMEWORK = {
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     ),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_RENDERER_CLASSES": (
+        "social_media_api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_THROTTLE_CLASSES": ("social_media_api.throttling.TokenBucketThrottle",),
+    "DEFAULT_THROTTLE_RATES": {
+        "read": os.getenv("THROTTLE_RATE_READ", "600/min"),
+        "search": os.getenv("THROTTLE_RATE_SEARCH", "120/min"),
+        "write": os.getenv("THROTTLE_RATE_WRITE", "120/min"),
+        "engagement": os.getenv("THROTTLE_RATE_ENGAGEMENT", "60/min"),
+        "auth": os.getenv("THROTTLE_RATE_AUTH", "10/min"),
+    },
+}
+
+# The schema is not generated in production, views get DRF's own schema class
+# and the annotations of social_media_api.openapi turn into no-ops, so
+# drf_spectacular need not be installed
+
+if PRODUCTION:
+    REST_FRAMEWORK["DEFAULT_SCHEMA_CLASS"] = "rest_framework.schemas.openapi.AutoSchema"
+    REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"] = (
+        "social_media_api.renderers.FastJSONRenderer",
+    )
+
+# Cache holding the throttle token buckets, decided with a single script call
+# when it is a Redis cache
+
+THROTTLE_CACHE = os.getenv("THROTTLE_CACHE", "default")
+
+# Responses smaller than MIN_SIZE bytes are sent uncompressed, compressed
+# bytes of responses with an ETag are cached for CACHE_TIMEOUT seconds
+
+RESPONSE_COMPRESSION = {
+    "MIN_SIZE": int(os.getenv("COMPRESSION_MIN_SIZE", 1024)),
+    "GZIP_LEVEL": int(os.getenv("COMPRESSION_GZIP_LEVEL", 6)),
+    "BROTLI_LEVEL": int(os.getenv("COMPRESSION_BROTLI_LEVEL", 4)),
+    "CACHE_TIMEOUT": int(os.getenv("COMPRESSION_CACHE_TIMEOUT", 300)),
+}
+
+# Pages of the profile list requested with ?page_size= or ?cursor=
+
+PROFILE_LIST = {
+    "PAGE_SIZE": int(os.getenv("PROFILE_LIST_PAGE_SIZE", 50)),
+    "MAX_PAGE_SIZE": int(os.getenv("PROFILE_LIST_MAX_PAGE_SIZE", 200)),
+}
+
+# Most used hashtags returned by hashtags/, ?limit= up to MAX_LIMIT, and the
+# posts indexed per batch by the backfill_post_tags command
+
+HASHTAGS = {
+    "LIMIT": int(os.getenv("HASHTAGS_LIMIT", 20)),
+    "MAX_LIMIT": int(os.getenv("HASHTAGS_MAX_LIMIT", 100)),
+    "BACKFILL_BATCH_SIZE": int(os.getenv("HASHTAGS_BACKFILL_BATCH_SIZE", 1000)),
+}
+
+# Username suggestions returned by profiles/autocomplete/, ?limit= up to MAX_LIMIT
+
+PROFILE_AUTOCOMPLETE = {
+    "LIMIT": int(os.getenv("PROFILE_AUTOCOMPLETE_LIMIT", 10)),
+    "MAX_LIMIT": int(os.getenv("PROFILE_AUTOCOMPLETE_MAX_LIMIT", 20)),
+}
+
+# Actors of a notification are counted once among its RECENT_ACTORS latest actors
+
+NOTIFICATIONS = {
+    "RECENT_ACTORS": int(os.getenv("NOTIFICATIONS_RECENT_ACTORS", 50)),
+    "PAGE_SIZE": int(os.getenv("NOTIFICATIONS_PAGE_SIZE", 20)),
+    "MAX_PAGE_SIZE": int(os.getenv("NOTIFICATIONS_MAX_PAGE_SIZE", 100)),
+}
+
+# Outbox messages are relayed every RELAY_SECONDS (see CELERY_BEAT_SCHEDULE),
+# BATCH_SIZE per transaction, and relayed again when still unhandled after
+# REDELIVER_SECONDS
+
+OUTBOX = {
+    "BATCH_SIZE": int(os.getenv("OUTBOX_BATCH_SIZE", 500)),
+    "MAX_BATCHES": int(os.getenv("OUTBOX_MAX_BATCHES", 20)),
+    "REDELIVER_SECONDS": int(os.getenv("OUTBOX_REDELIVER_SECONDS", 300)),
 }
 
+# Deleted accounts are purged BATCH_SIZE rows at a time, a task deletes up to
+# BATCHES_PER_TASK batches before queueing the next one. A purge holds its
+# account for LEASE_SECONDS, renewed after every batch
+
+ACCOUNT_DELETION = {
+    "BATCH_SIZE": int(os.getenv("ACCOUNT_DELETION_BATCH_SIZE", 1000)),
+    "BATCHES_PER_TASK": int(os.getenv("ACCOUNT_DELETION_BATCHES_PER_TASK", 50)),
+    "LEASE_SECONDS": int(os.getenv("ACCOUNT_DELETION_LEASE_SECONDS", 300)),
+}
+
+# Rows read and serialized at a time by list actions called with ?stream=true
+
+STREAMING_CHUNK_SIZE = int(os.getenv("STREAMING_CHUNK_SIZE", 500))
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "Social Media API",
     "DESCRIPTION": "API for Social Media Application built with Django and DRF",
@@ -161,6 +357,18 @@ SPECTACULAR_SETTINGS = {
     },
 }
 
+# api/doc/ serves the schema written to FILE at build time by "manage.py
+# spectacular --file" when drf_spectacular is not installed, as in the
+# production profile, and generates it on the first request otherwise.
+# Generated schemas are shared in the cache by the processes running the same
+# CODE_VERSION. api/doc/<version>/ is cached for MAX_AGE seconds
+
+OPENAPI_SCHEMA = {
+    "FILE": Path(os.getenv("OPENAPI_SCHEMA_FILE", BASE_DIR / "openapi-schema.yml")),
+    "CODE_VERSION": os.getenv("CODE_VERSION", ""),
+    "MAX_AGE": int(os.getenv("OPENAPI_SCHEMA_MAX_AGE", 365 * 24 * 3600)),
+}
+
 # Simple JWT Configuration
 
 SIMPLE_JWT = {
@@ -170,7 +378,152 @@ SIMPLE_JWT = {
     "BLACKLIST_AFTER_ROTATION": True,
 }
 
+# In-process LRU of the liked post ids of recent viewers,
+# disabled when VIEWER_CACHE_MAX_VIEWERS is 0
+
+VIEWER_RELATIONSHIP_CACHE = {
+    "MAX_VIEWERS": int(os.getenv("VIEWER_CACHE_MAX_VIEWERS", 0)),
+    "MAX_IDS": int(os.getenv("VIEWER_CACHE_MAX_IDS", 5000)),
+    "TTL": int(os.getenv("VIEWER_CACHE_TTL", 30)),
+}
+
+# Seconds the cached follow graph adjacency lists are kept, they are only
+# cached when SHARED_CACHE is set
+
+FOLLOW_GRAPH_TIMEOUT = int(os.getenv("FOLLOW_GRAPH_TIMEOUT", 3600))
+
+# Seconds the version stamps behind the ETags of post and profile responses
+# are kept, a response also changes when one of its stamps expires. ETags are
+# only sent when SHARED_CACHE is set
+
+CONDITIONAL_GET_VERSION_TIMEOUT = int(
+    os.getenv("CONDITIONAL_GET_VERSION_TIMEOUT", 86400)
+)
+
+# Feed ?since= changes, entries are kept for RETENTION_HOURS and clients
+# with more than MAX_CHANGES pending changes refetch the whole feed
+
+FEED_CHANGES = {
+    "RETENTION_HOURS": int(os.getenv("FEED_CHANGES_RETENTION_HOURS", 72)),
+    "MAX_CHANGES": int(os.getenv("FEED_CHANGES_MAX_CHANGES", 500)),
+    "COMMIT_LAG_SECONDS": int(os.getenv("FEED_CHANGES_COMMIT_LAG_SECONDS", 5)),
+    "PRUNE_BATCH_SIZE": int(os.getenv("FEED_CHANGES_PRUNE_BATCH_SIZE", 5000)),
+}
+
+# "Who to follow" suggestions kept per profile and profiles computed per batch
+
+FOLLOW_SUGGESTIONS = {
+    "TOP_K": int(os.getenv("FOLLOW_SUGGESTIONS_TOP_K", 20)),
+    "BATCH_SIZE": int(os.getenv("FOLLOW_SUGGESTIONS_BATCH_SIZE", 500)),
+}
+
+# Number of the newest followers and followed profiles inlined in the
+# profile detail
+
+PROFILE_DETAIL = {
+    "RELATIONSHIPS_LIMIT": int(os.getenv("PROFILE_DETAIL_RELATIONSHIPS_LIMIT", 50)),
+}
+
+# Page size of the likes and comments of a post, and the number of the newest
+# ones inlined in the post detail
+
+POST_ENGAGEMENT = {
+    "PAGE_SIZE": int(os.getenv("POST_ENGAGEMENT_PAGE_SIZE", 20)),
+    "MAX_PAGE_SIZE": int(os.getenv("POST_ENGAGEMENT_MAX_PAGE_SIZE", 100)),
+    "DETAIL_LIMIT": int(os.getenv("POST_ENGAGEMENT_DETAIL_LIMIT", 10)),
+}
+
+# Trending posts, likes and comments lose half their weight every
+# HALF_LIFE_HOURS and only those within WINDOW_HOURS are counted. Engagements
+# are folded in once COMMIT_LAG_SECONDS old, a weight of 0 ignores them
+
+TRENDING_POSTS = {
+    "HALF_LIFE_HOURS": float(os.getenv("TRENDING_HALF_LIFE_HOURS", 6)),
+    "WINDOW_HOURS": int(os.getenv("TRENDING_WINDOW_HOURS", 72)),
+    "REBUILD_HOURS": int(os.getenv("TRENDING_REBUILD_HOURS", 24)),
+    "LIKE_WEIGHT": float(os.getenv("TRENDING_LIKE_WEIGHT", 1)),
+    "COMMENT_WEIGHT": float(os.getenv("TRENDING_COMMENT_WEIGHT", 2)),
+    "COMMIT_LAG_SECONDS": int(os.getenv("TRENDING_COMMIT_LAG_SECONDS", 5)),
+    "LIMIT": int(os.getenv("TRENDING_LIMIT", 20)),
+    "MAX_LIMIT": int(os.getenv("TRENDING_MAX_LIMIT", 100)),
+}
+
+# N+1 query detection, MODE is one of "raise", "log" or "off"
+
+N_PLUS_ONE_DETECTION = {
+    "MODE": os.getenv("N_PLUS_ONE_MODE", "log"),
+    "THRESHOLD": int(os.getenv("N_PLUS_ONE_THRESHOLD", 5)),
+    "SAMPLE_RATE": float(os.getenv("N_PLUS_ONE_SAMPLE_RATE", 0.01)),
+}
+
+TEST_RUNNER = "social_media_api.test_runner.NPlusOneDetectingTestRunner"
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "social_media_api": {
+            "handlers": ["console"],
+            "level": os.getenv("LOG_LEVEL", "INFO"),
+        },
+    },
+}
+
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL")
 CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND")
 CELERY_TIMEZONE = "Europe/Kyiv"
 CELERY_TASK_TRACK_STARTED = True
+
+# Short publishing tasks, media file work and long maintenance jobs run on
+# their own queues so a backlog of one doesn't delay the others
+
+CELERY_TASK_DEFAULT_QUEUE = "default"
+CELERY_TASK_ROUTES = {
+    "core_social.tasks.relay_outbox": {"queue": "publishing"},
+    "core_social.tasks.publish_scheduled_posts": {"queue": "publishing"},
+    "core_social.tasks.deliver_notifications": {"queue": "publishing"},
+    "core_social.tasks.delete_media_files": {"queue": "media"},
+    "core_social.tasks.purge_accounts": {"queue": "maintenance"},
+    "core_social.tasks.refresh_follow_suggestions": {"queue": "maintenance"},
+    "core_social.tasks.refresh_trending_scores": {"queue": "maintenance"},
+    "core_social.tasks.prune_feed_changes": {"queue": "maintenance"},
+}
+
+# Tasks are acknowledged after they finish and requeued when their worker
+# dies, outbox handlers being safe to run twice. Workers reserve one task
+# per process so a long task doesn't hold back others queued behind it,
+# short-task workers can raise it with --prefetch-multiplier. Unacknowledged
+# tasks are redelivered by a Redis broker after the visibility timeout,
+# which has to exceed the longest task.
+
+CELERY_TASK_ACKS_LATE = True
+CELERY_TASK_REJECT_ON_WORKER_LOST = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = int(
+    os.getenv("CELERY_WORKER_PREFETCH_MULTIPLIER", 1)
+)
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    "visibility_timeout": int(os.getenv("CELERY_VISIBILITY_TIMEOUT", 3600))
+}
+CELERY_BEAT_SCHEDULE = {
+    "refresh-follow-suggestions": {
+        "task": "core_social.tasks.refresh_follow_suggestions",
+        "schedule": timedelta(
+            minutes=int(os.getenv("FOLLOW_SUGGESTIONS_REFRESH_MINUTES", 60))
+        ),
+    },
+    "prune-feed-changes": {
+        "task": "core_social.tasks.prune_feed_changes",
+        "schedule": timedelta(hours=1),
+    },
+    "refresh-trending-scores": {
+        "task": "core_social.tasks.refresh_trending_scores",
+        "schedule": timedelta(minutes=int(os.getenv("TRENDING_REFRESH_MINUTES", 5))),
+    },
+    "relay-outbox": {
+        "task": "core_social.tasks.relay_outbox",
+        "schedule": timedelta(seconds=int(os.getenv("OUTBOX_RELAY_SECONDS", 2))),
+    },
+}
@@ -0,0 +1,147 @@
+import bisect
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from social_media_api.instrumentation import HISTOGRAM_BUCKETS_MS
+
+# Task metrics are counters in the shared cache, so the web process can
+# report what every worker process recorded. Each counter is incremented
+# atomically when the cache is Redis. Nothing is recorded without
+# SHARED_CACHE, the counters of a local memory cache being seen by no one.
+
+PUBLISHED_AT_HEADER = "published_at"
+
+COUNTERS = ("count", "failures", "retries")
+HISTOGRAMS = ("queue_wait_ms", "run_ms")
+
+# Counters never expire, so every counter and bucket of a task covers the
+# same runs. They are bounded by the number of tasks.
+TIMEOUT = None
+
+_started = {}
+
+
+def _key(task_name, name):
+    return f"task-metrics:{task_name}:{name}"
+
+
+def _histogram_keys(task_name, metric):
+    return [
+        _key(task_name, f"{metric}:{index}")
+        for index in range(len(HISTOGRAM_BUCKETS_MS) + 1)
+    ]
+
+
+def _increment(key, delta=1):
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        if not cache.add(key, delta, timeout=TIMEOUT):
+            cache.incr(key, delta)
+
+
+def _observe(task_name, metric, value_ms):
+    index = bisect.bisect_left(HISTOGRAM_BUCKETS_MS, value_ms)
+    _increment(_histogram_keys(task_name, metric)[index])
+    _increment(_key(task_name, f"{metric}:total_us"), round(value_ms * 1000))
+
+
+def record(task_name, queue_wait_ms, run_ms, state):
+    """Add a finished run of the task to its counters"""
+    if not settings.SHARED_CACHE:
+        return
+    _increment(_key(task_name, "count"))
+    if state == "FAILURE":
+        _increment(_key(task_name, "failures"))
+    elif state == "RETRY":
+        _increment(_key(task_name, "retries"))
+    if queue_wait_ms is not None:
+        _observe(task_name, "queue_wait_ms", queue_wait_ms)
+    _observe(task_name, "run_ms", run_ms)
+
+
+def reported_task_names():
+    """
+    Names of the tasks to report: the routed ones, which the web process
+    knows without importing the task modules, and any registered others.
+    """
+    from celery import current_app
+
+    names = set(settings.CELERY_TASK_ROUTES) | {
+        name for name in current_app.tasks if not name.startswith("celery.")
+    }
+    return sorted(names)
+
+
+def snapshot(task_names):
+    """Counters and histograms of the tasks, by task name"""
+    keys = {
+        task_name: {
+            **{name: _key(task_name, name) for name in COUNTERS},
+            **{
+                f"{metric}:total_us": _key(task_name, f"{metric}:total_us")
+                for metric in HISTOGRAMS
+            },
+        }
+        for task_name in task_names
+    }
+    histogram_keys = {
+        task_name: {metric: _histogram_keys(task_name, metric) for metric in HISTOGRAMS}
+        for task_name in task_names
+    }
+    values = cache.get_many(
+        [key for names in keys.values() for key in names.values()]
+        + [
+            key
+            for metrics in histogram_keys.values()
+            for bucket_keys in metrics.values()
+            for key in bucket_keys
+        ]
+    )
+
+    labels = [f"le_{bound}" for bound in HISTOGRAM_BUCKETS_MS] + ["inf"]
+    stats = {}
+    for task_name in task_names:
+        counters = {name: values.get(key, 0) for name, key in keys[task_name].items()}
+        if not counters["count"]:
+            continue
+        task_stats = {name: counters[name] for name in COUNTERS}
+        for metric, bucket_keys in histogram_keys[task_name].items():
+            buckets = [values.get(key, 0) for key in bucket_keys]
+            observed = sum(buckets)
+            total_ms = counters[f"{metric}:total_us"] / 1000
+            task_stats[metric] = {
+                "count": observed,
+                "avg_ms": round(total_ms / observed, 2) if observed else 0.0,
+                "buckets": dict(zip(labels, buckets)),
+            }
+        stats[task_name] = task_stats
+    return stats
+
+
+def stamp_published_at(headers=None, **kwargs):
+    """before_task_publish receiver recording when the task was sent"""
+    if headers is not None:
+        headers.setdefault(PUBLISHED_AT_HEADER, time.time())
+
+
+def start_run(task_id=None, task=None, **kwargs):
+    """task_prerun receiver"""
+    published_at = task.request.get(PUBLISHED_AT_HEADER) or (
+        task.request.headers or {}
+    ).get(PUBLISHED_AT_HEADER)
+    _started[task_id] = (time.time(), time.perf_counter(), published_at)
+
+
+def finish_run(task_id=None, task=None, state=None, **kwargs):
+    """task_postrun receiver"""
+    started = _started.pop(task_id, None)
+    if started is None:
+        return
+    received_at, start, published_at = started
+    queue_wait_ms = (
+        max(0.0, (received_at - published_at) * 1000) if published_at else None
+    )
+    record(task.name, queue_wait_ms, (time.perf_counter() - start) * 1000, state)
@@ -0,0 +1,28 @@
+import logging
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+from social_media_api import instrumentation
+
+
+class NPlusOneDetectingTestRunner(DiscoverRunner):
+    """
+    Test runner failing any request that executes an N+1 query pattern.
+    The per request timing log is silenced, warnings still show.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._n_plus_one_detection = settings.N_PLUS_ONE_DETECTION
+        settings.N_PLUS_ONE_DETECTION = {
+            **settings.N_PLUS_ONE_DETECTION,
+            "MODE": "raise",
+        }
+        self._timing_log_level = instrumentation.logger.level
+        instrumentation.logger.setLevel(logging.WARNING)
+
+    def teardown_test_environment(self, **kwargs):
+        instrumentation.logger.setLevel(self._timing_log_level)
+        settings.N_PLUS_ONE_DETECTION = self._n_plus_one_detection
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,131 @@
+import os
+import re
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import path
+
+from social_media_api.nplusone import NPlusOneQueryError
+from social_media_api.throttling import parse_rate
+
+THRESHOLD = 3
+
+
+def repeated_queries(request):
+    for pk in range(THRESHOLD):
+        list(get_user_model().objects.filter(pk=pk))
+    return HttpResponse()
+
+
+def single_query(request):
+    list(get_user_model().objects.filter(pk__in=range(THRESHOLD)))
+    return HttpResponse()
+
+
+urlpatterns = [
+    path("repeated/", repeated_queries, name="repeated"),
+    path("single/", single_query, name="single"),
+]
+
+
+class SlowMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        time.sleep(0.2)
+        return response
+
+
+def detection(mode):
+    return override_settings(
+        N_PLUS_ONE_DETECTION={"MODE": mode, "THRESHOLD": THRESHOLD, "SAMPLE_RATE": 1}
+    )
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class NPlusOneDetectionTests(TestCase):
+    @detection("raise")
+    def test_repeated_query_shape_raises(self):
+        with self.assertRaises(NPlusOneQueryError):
+            self.client.get("/repeated/")
+
+    @detection("raise")
+    def test_single_query_passes(self):
+        response = self.client.get("/single/")
+
+        self.assertEqual(response.status_code, 200)
+
+    @detection("log")
+    def test_repeated_query_shape_is_logged(self):
+        with self.assertLogs("social_media_api.nplusone", "WARNING") as logs:
+            response = self.client.get("/repeated/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Possible N+1 query in repeated", logs.output[0])
+
+    @detection("log")
+    def test_single_query_is_not_logged(self):
+        with self.assertNoLogs("social_media_api.nplusone", "WARNING"):
+            self.client.get("/single/")
+
+
+PRODUCTION_IMPORTS = """
+import sys
+
+sys.modules["drf_spectacular"] = None
+import django
+
+django.setup()
+import core_social.async_views, core_social.views, social_media_api.urls
+"""
+
+
+@override_settings(
+    ROOT_URLCONF=__name__,
+    MIDDLEWARE=[
+        "social_media_api.instrumentation.RequestTimingMiddleware",
+        f"{__name__}.SlowMiddleware",
+        "social_media_api.instrumentation.ViewTimingMiddleware",
+    ],
+)
+class RequestTimingTests(TestCase):
+    def test_view_time_excludes_other_middleware(self):
+        response = self.client.get("/single/")
+
+        view_ms = float(re.search(r"view;dur=([\d.]+)", response["Server-Timing"])[1])
+        self.assertLess(view_ms, 200)
+
+
+class ProductionProfileTests(TestCase):
+    def test_imports_without_drf_spectacular(self):
+        env = {
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": "social_media_api.settings",
+            "SETTINGS_PROFILE": "production",
+            "SECRET_KEY": "production-profile-test",
+        }
+
+        result = subprocess.run(
+            [sys.executable, "-c", PRODUCTION_IMPORTS],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+
+class ParseRateTests(SimpleTestCase):
+    def test_parses_drf_rates(self):
+        self.assertEqual(parse_rate("10/s"), (10, 1))
+        self.assertEqual(parse_rate("60/min"), (60, 60))
+        self.assertEqual(parse_rate("100/hour"), (100, 3600))
+        self.assertEqual(parse_rate("1000/day"), (1000, 86400))
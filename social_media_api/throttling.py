@@ -0,0 +1,148 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+# Refill the bucket for the time since its last request, then take a token.
+# Returns whether a token was taken and the seconds until one is available.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call("HMGET", KEYS[1], "tokens", "ts")
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "ts", tostring(now))
+redis.call("EXPIRE", KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(wait)}
+"""
+
+
+def take_token(state, capacity, rate, now):
+    """Python version of TOKEN_BUCKET_SCRIPT, state is (tokens, ts) or None"""
+    tokens, ts = state or (capacity, now)
+    tokens = min(capacity, tokens + max(0.0, now - ts) * rate)
+    if tokens >= 1:
+        return True, 0.0, (tokens - 1, now)
+    return False, (1 - tokens) / rate, (tokens, now)
+
+
+class RedisTokenBuckets:
+    """Buckets updated by a Lua script, one round trip per decision"""
+
+    def __init__(self, cache):
+        self.cache = cache
+        self._script = None
+
+    def take(self, key, capacity, rate):
+        if self._script is None:
+            client = self.cache._cache.get_client(write=True)
+            self._script = client.register_script(TOKEN_BUCKET_SCRIPT)
+        allowed, wait = self._script(
+            keys=[self.cache.make_and_validate_key(key)],
+            args=[capacity, rate, time.time()],
+            client=self.cache._cache.get_client(key, write=True),
+        )
+        return bool(allowed), float(wait)
+
+
+class LocalTokenBuckets:
+    """
+    Buckets kept in any other cache backend. Decisions are atomic within a
+    process only, which is exact for the local-memory cache used in tests.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate):
+        with self._lock:
+            allowed, wait, state = take_token(
+                self.cache.get(key), capacity, rate, time.time()
+            )
+            self.cache.set(key, state, timeout=int(capacity / rate) + 1)
+        return allowed, wait
+
+
+# Seconds of the periods of DRF's rate format, by their first letter
+RATE_PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_rate(rate):
+    """A rate like "60/min" as the number of requests and the period's seconds"""
+    num_requests, period = rate.split("/")
+    return int(num_requests), RATE_PERIODS[period[0]]
+
+
+_buckets = {}
+
+
+def token_buckets():
+    alias = settings.THROTTLE_CACHE
+    if alias not in _buckets:
+        cache = caches[alias]
+        if isinstance(cache, RedisCache):
+            _buckets[alias] = RedisTokenBuckets(cache)
+        else:
+            _buckets[alias] = LocalTokenBuckets(cache)
+    return _buckets[alias]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Token bucket per client and scope. A rate of "60/min" allows bursts of
+    60 requests and refills one token a second. The scope is the view's
+    throttle_scope, otherwise "search" for safe requests using one of the
+    view's throttle_search_params, "read" for other safe requests and
+    "write" for the rest. Scopes without a rate aren't throttled. Clients
+    are users, or IP addresses when anonymous.
+    """
+
+    def __init__(self):
+        self._wait = None
+
+    def get_scope(self, request, view):
+        scope = getattr(view, "throttle_scope", None)
+        if scope:
+            return scope
+        if request.method not in SAFE_METHODS:
+            return "write"
+        search_params = getattr(view, "throttle_search_params", ())
+        query_params = getattr(request, "query_params", request.GET)
+        if any(param in query_params for param in search_params):
+            return "search"
+        return "read"
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(request, view)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+        if rate is None:
+            return True
+        capacity, duration = parse_rate(rate)
+
+        if request.user and request.user.is_authenticated:
+            ident = f"user:{request.user.pk}"
+        else:
+            ident = f"ip:{self.get_ident(request)}"
+        allowed, self._wait = token_buckets().take(
+            f"throttle:{scope}:{ident}", capacity, capacity / duration
+        )
+        return allowed
+
+    def wait(self):
+        return self._wait
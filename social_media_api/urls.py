@@ -14,30 +14,65 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.apps import apps
 from django.conf import settings
 from django.conf.urls.static import static
-from django.contrib import admin
-from django.urls import path, include
-from drf_spectacular.views import (
-    SpectacularAPIView,
-    SpectacularSwaggerView,
-    SpectacularRedocView,
+from django.urls import path, include, re_path
+
+from social_media_api.views import (
+    RequestTimingStatsView,
+    ConnectionPoolStatsView,
+    TaskMetricsStatsView,
+    schema_view,
 )
 
 urlpatterns = [
-    path("admin/", admin.site.urls),
     path("api/user/", include("user.urls", namespace="user")),
     path("api/core_social/", include("core_social.urls", namespace="core_social")),
-    path("__debug__/", include("debug_toolbar.urls")),
-    path("api/doc/", SpectacularAPIView.as_view(), name="schema"),
     path(
-        "api/doc/swagger/",
-        SpectacularSwaggerView.as_view(url_name="schema"),
-        name="swagger-ui",
+        "api/metrics/requests/",
+        RequestTimingStatsView.as_view(),
+        name="request-timing-stats",
+    ),
+    path(
+        "api/metrics/connection-pools/",
+        ConnectionPoolStatsView.as_view(),
+        name="connection-pool-stats",
     ),
     path(
-        "api/doc/redoc/",
-        SpectacularRedocView.as_view(url_name="schema"),
-        name="redoc",
+        "api/metrics/tasks/",
+        TaskMetricsStatsView.as_view(),
+        name="task-metrics-stats",
+    ),
+    path("api/doc/", schema_view, name="schema"),
+    re_path(
+        r"^api/doc/(?P<version>[0-9a-f]{16})/$", schema_view, name="schema-version"
     ),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+
+# Routes of optional apps are mounted only when the app is installed, so a
+# process does not import what its settings profile leaves out
+
+if apps.is_installed("django.contrib.admin"):
+    from django.contrib import admin
+
+    urlpatterns.append(path("admin/", admin.site.urls))
+
+if apps.is_installed("debug_toolbar"):
+    urlpatterns.append(path("__debug__/", include("debug_toolbar.urls")))
+
+if apps.is_installed("drf_spectacular"):
+    from drf_spectacular.views import SpectacularSwaggerView, SpectacularRedocView
+
+    urlpatterns += [
+        path(
+            "api/doc/swagger/",
+            SpectacularSwaggerView.as_view(url_name="schema"),
+            name="swagger-ui",
+        ),
+        path(
+            "api/doc/redoc/",
+            SpectacularRedocView.as_view(url_name="schema"),
+            name="redoc",
+        ),
+    ]
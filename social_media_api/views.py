@@ -0,0 +1,95 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.urls import reverse
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from social_media_api.db_backends.pool import pool_stats
+from social_media_api import schema, task_metrics
+from social_media_api.openapi import OpenApiTypes, extend_schema
+from social_media_api.instrumentation import timing_registry
+
+
+class RequestTimingStatsView(APIView):
+    """Aggregated request timing histograms of this process by view name"""
+
+    permission_classes = (IsAdminUser,)
+
+    @extend_schema(responses=OpenApiTypes.OBJECT)
+    def get(self, request):
+        return Response(timing_registry.snapshot())
+
+
+class ConnectionPoolStatsView(APIView):
+    """Saturation and wait times of the database connection pools of this process"""
+
+    permission_classes = (IsAdminUser,)
+
+    @extend_schema(responses=OpenApiTypes.OBJECT)
+    def get(self, request):
+        return Response(pool_stats())
+
+
+class TaskMetricsStatsView(APIView):
+    """Queue wait, run time and failures of the Celery tasks of all workers"""
+
+    permission_classes = (IsAdminUser,)
+
+    @extend_schema(responses=OpenApiTypes.OBJECT)
+    def get(self, request):
+        if not settings.SHARED_CACHE:
+            return Response(
+                {"detail": "Task metrics are only recorded with SHARED_CACHE."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+        return Response(task_metrics.snapshot(task_metrics.reported_task_names()))
+
+
+JSON_MEDIA_TYPES = ("application/json", "application/vnd.oai.openapi+json")
+
+
+def schema_view(request, version=None):
+    """
+    The OpenAPI schema, YAML unless ?format=json or a JSON Accept header.
+    api/doc/ is revalidated with its ETag, api/doc/<version>/ never changes
+    and is cached for good.
+    """
+    accept = request.headers.get("Accept", "")
+    schema_format = (
+        "json"
+        if request.GET.get("format") == "json"
+        or any(media_type in accept for media_type in JSON_MEDIA_TYPES)
+        else "yaml"
+    )
+    try:
+        document = schema.schema_document(schema_format)
+    except FileNotFoundError:
+        raise Http404("The OpenAPI schema was not generated.")
+    if version is not None and version != document.version:
+        raise Http404("This version of the OpenAPI schema is not served.")
+
+    response = get_conditional_response(request, etag=document.etag)
+    if response is None:
+        response = HttpResponse(
+            document.content, content_type=schema.FORMATS[schema_format]
+        )
+    response["ETag"] = document.etag
+    response["Link"] = '<%s>; rel="canonical"' % reverse(
+        "schema-version", args=[document.version]
+    )
+    if version is None:
+        patch_cache_control(response, public=True, no_cache=True)
+    else:
+        patch_cache_control(
+            response, public=True, max_age=settings.OPENAPI_SCHEMA["MAX_AGE"]
+        )
+        response["Cache-Control"] += ", immutable"
+    patch_vary_headers(response, ("Accept",))
+    return response
@@ -1,3 +1,77 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from pathlib import Path
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+LAGGING_REPLICA = "lagging_replica"
+
+
+class ReplicaStickinessTests(TransactionTestCase):
+    """A replica in its own SQLite file never receives the primary's writes"""
+
+    databases = "__all__"
+
+    @classmethod
+    def setUpClass(cls):
+        cls.replica_dir = tempfile.mkdtemp()
+        replica = {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": str(Path(cls.replica_dir) / "replica.sqlite3"),
+        }
+        connections.settings[LAGGING_REPLICA] = connections.configure_settings(
+            {"default": connections.settings["default"], LAGGING_REPLICA: replica}
+        )[LAGGING_REPLICA]
+        call_command("migrate", database=LAGGING_REPLICA, verbosity=0)
+        cls.replica_settings = override_settings(SHARED_CACHE=True)
+        cls.replica_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.replica_settings.disable()
+        connections[LAGGING_REPLICA].close()
+        del connections[LAGGING_REPLICA]
+        del connections.settings[LAGGING_REPLICA]
+        shutil.rmtree(cls.replica_dir)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        credentials = {"email": "new@example.com", "password": "password123"}
+        response = self.client.post(reverse("user:create"), credentials)
+        self.assertEqual(response.status_code, 201)
+        response = self.client.post(reverse("user:token_obtain_pair"), credentials)
+        self.assertEqual(response.status_code, 200)
+        self.refresh = response.data["refresh"]
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+
+    def test_new_user_reads_from_primary(self):
+        response = self.client.get(reverse("user:manage"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["email"], "new@example.com")
+
+    def test_user_reads_from_replica_once_unpinned(self):
+        cache.clear()
+
+        response = self.client.get(reverse("user:manage"))
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_refreshing_token_pins_user(self):
+        cache.clear()
+        response = self.client.post(
+            reverse("user:token_refresh"), {"refresh": self.refresh}
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+
+        response = self.client.get(reverse("user:manage"))
+
+        self.assertEqual(response.status_code, 200)
@@ -1,16 +1,18 @@
 from django.urls import path
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-    TokenVerifyView,
-)
+from rest_framework_simplejwt.views import TokenVerifyView
 
-from user.views import CreateUserView, ManageUserView, LogoutView
+from user.views import (
+    CreateUserView,
+    ManageUserView,
+    LogoutView,
+    LoginView,
+    RefreshTokenView,
+)
 
 urlpatterns = [
     path("register/", CreateUserView.as_view(), name="create"),
-    path("token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
-    path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
+    path("token/", LoginView.as_view(), name="token_obtain_pair"),
+    path("token/refresh/", RefreshTokenView.as_view(), name="token_refresh"),
     path("token/verify/", TokenVerifyView.as_view(), name="token_verify"),
     path("logout/", LogoutView.as_view(), name="logout"),
     path("me/", ManageUserView.as_view(), name="manage"),
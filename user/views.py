@@ -3,8 +3,16 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework_simplejwt.views import TokenBlacklistView
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework_simplejwt.views import (
+    TokenBlacklistView,
+    TokenObtainPairView,
+    TokenRefreshView,
+)
 
+from core_social import versioning
+from social_media_api.db_routers import pin_to_primary
 from user.serializers import UserSerializer
 
 
@@ -12,6 +20,11 @@ class CreateUserView(generics.CreateAPIView):
     """Create a new user in the system"""
 
     serializer_class = UserSerializer
+    throttle_scope = "auth"
+
+    def perform_create(self, serializer):
+        user = serializer.save()
+        pin_to_primary(user.id)
 
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
@@ -24,6 +37,10 @@ class ManageUserView(generics.RetrieveUpdateAPIView):
     def get_object(self):
         return self.request.user
 
+    def perform_update(self, serializer):
+        user = serializer.save()
+        versioning.user_changed(user.profile.id)
+
 
 class LogoutView(TokenBlacklistView):
     """Logout the authenticated user by blacklisting the refresh token"""
@@ -37,3 +54,26 @@ class LogoutView(TokenBlacklistView):
         if response.status_code == 200:
             return Response({"message": "Logged out successfully"}, status=200)
         return response
+
+
+class PinIssuedTokenMixin:
+    """Read from the primary for the user an access token is issued to"""
+
+    def post(self, request, *args, **kwargs):
+        response = super().post(request, *args, **kwargs)
+        if response.status_code == 200:
+            access = AccessToken(response.data["access"])
+            pin_to_primary(access[api_settings.USER_ID_CLAIM])
+        return response
+
+
+class LoginView(PinIssuedTokenMixin, TokenObtainPairView):
+    """Obtain a token pair, throttled with the other credential checks"""
+
+    throttle_scope = "auth"
+
+
+class RefreshTokenView(PinIssuedTokenMixin, TokenRefreshView):
+    """Refresh an access token, throttled with the other credential checks"""
+
+    throttle_scope = "auth"